@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Cold-start import benchmark for the scripts' entry points.
+
+Every pool worker and DataLoader process pays for its imports, so each entry point
+is imported in a fresh interpreter (best of --repeat) and reported with its wall
+time, peak RSS and which heavy optional dependencies it pulled in.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ENTRY_POINTS = {
+    "generate_tdl_train_set": "import generate_tdl_train_set",
+    "generate_tdl_test_set": "import generate_tdl_test_set",
+    "reader": "from src.reader import TDLShardReader",
+    "plotting": "import src.utils",
+}
+HEAVY_MODULES = ("matplotlib", "NeoRadium", "scipy", "tqdm")
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": seconds,
+    "peak_rss_mb": rss / (1 << 20) if sys.platform == "darwin" else rss / 1024,
+    "heavy_modules": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> dict:
+    """Best-of-repeat cold import of statement, each in a new interpreter."""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        runs.append(json.loads(out.stdout))
+    return min(runs, key=lambda run: run["seconds"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the entry points.")
+    parser.add_argument("--entry-points", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", type=Path, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'entry point':<24}{'import s':>10}{'peak RSS MB':>13}  heavy modules")
+    for name in args.entry_points:
+        results[name] = measure(ENTRY_POINTS[name], args.repeat)
+        result = results[name]
+        print(f"{name:<24}{result['seconds']:>10.3f}{result['peak_rss_mb']:>13.0f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
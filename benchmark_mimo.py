@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory scaling of TDL channel generation with the antenna count.
+
+For each Nr x Nt configuration (1x1 up to massive-MIMO 32x4) and spatial
+correlation level, measures:
+
+  stream  iterate `iter_tdl_channels` block by block and drop the blocks (the
+          cost of generation alone, memory bounded by one block)
+  save    `write_tdl_channels` into a .npy memmap, normalized as the train/test
+          scripts do
+
+Reports channels/s, links/s (channels x Nr x Nt per second, flat when the cost per
+antenna pair is constant), the channels per block chosen under --max-block-mb, and
+peak RSS over the RSS after imports. Pass several --max-block-mb values to see the
+memory/throughput trade-off of the block budget.
+
+Each point runs in a fresh (spawned) process, best of --repeat, results as JSON.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+ANTENNAS = ["1x1", "2x2", "4x4", "8x4", "16x4", "32x4"]
+CORRELATIONS = ["Low", "High"]
+MODES = ("stream", "save")
+
+
+def point_name(point: dict) -> str:
+    return ",".join(f"{k}={v}" for k, v in point.items())
+
+
+def _run_point(point: dict, num_channels: int, backend: str, repeat: int) -> dict:
+    """Runs in a child process: time one point, return its measurements."""
+    from src.profiling import peak_rss_mb
+    from src.tdl import block_channels, iter_tdl_channels, write_tdl_channels
+
+    rx, tx = (int(n) for n in point["antennas"].split("x"))
+    max_block_bytes = int(point["max_block_mb"] * (1 << 20))
+    kwargs = {
+        "random_seed": 123,
+        "num_rbs": point["num_rbs"],
+        "tx_antenna_count": tx,
+        "rx_antenna_count": rx,
+        "delay_spread": 300,
+        "doppler_shift": 100,
+        "profile": point["profile"],
+        "sos_type": "GMEDS1",
+        "mimo_correlation": point["mimo_correlation"],
+        "backend": backend,
+        "show_progress": False,
+        "max_block_bytes": max_block_bytes,
+    }
+    import_rss = peak_rss_mb()
+    seconds, bytes_written = [], 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if point["mode"] == "stream":
+                for _ in iter_tdl_channels(num_channels, **kwargs):
+                    pass
+            else:
+                path = Path(tmp) / "bench.npy"
+                write_tdl_channels(path, num_channels, **kwargs)
+                bytes_written = path.stat().st_size
+                path.unlink()
+            seconds.append(time.perf_counter() - start)
+    best = min(seconds)
+    return {
+        "seconds": best,
+        "channels_per_s": num_channels / best,
+        "links_per_s": num_channels * rx * tx / best,
+        "block_channels": block_channels(256, point["num_rbs"], rx, tx, max_block_bytes),
+        "import_rss_mb": import_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "bytes_written": int(bytes_written),
+    }
+
+
+def run_benchmark(points: list[dict], num_channels: int, backend: str, repeat: int) -> dict:
+    from src.tdl import backend_version
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for point in points:
+        name = point_name(point)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(_run_point, point, num_channels, backend, repeat).result()
+        results[name] = {"params": point, **result}
+        print(f"  [{len(results)}/{len(points)}] {name}: {result['channels_per_s']:.1f} ch/s, "
+              f"{result['links_per_s']:.0f} links/s, block {result['block_channels']} ch, "
+              f"+{result['peak_rss_mb'] - result['import_rss_mb']:.0f} MB")
+    return {
+        "meta": {
+            "backend": backend,
+            "backend_version": backend_version(backend),
+            "num_channels": num_channels,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark TDL generation throughput and memory vs. antenna count.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("benchmark_mimo.json"),
+                        help="Where to write the JSON results (default: benchmark_mimo.json)")
+    parser.add_argument("--antennas", nargs="+", default=ANTENNAS, help="RxxTx configurations, e.g. 32x4")
+    parser.add_argument("--correlations", nargs="+", default=CORRELATIONS,
+                        choices=["Low", "Medium", "MediumA", "High"])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--max-block-mb", nargs="+", type=float, default=[64],
+                        help="Block budgets to compare, in MiB (default: 64, see src.tdl.DEFAULT_MAX_BLOCK_BYTES)")
+    parser.add_argument("--profile", default="A")
+    parser.add_argument("--num-rbs", type=int, default=10)
+    parser.add_argument("--num-channels", type=int, default=128)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+
+    points = [
+        {"antennas": antennas, "mimo_correlation": correlation, "mode": mode, "max_block_mb": max_block_mb,
+         "profile": args.profile, "num_rbs": args.num_rbs}
+        for antennas in args.antennas
+        for correlation in args.correlations
+        for max_block_mb in args.max_block_mb
+        for mode in args.modes
+    ]
+    current = run_benchmark(points, args.num_channels, args.backend, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for TDL channel generation.
+
+Starting from a baseline point, varies one cost driver at a time (profile,
+num_rbs, spacing, antennas, slots_per_channel, sos_num_sins, sos_type) and
+measures each point both in memory (`generate_tdl_channels`) and through the
+save path the train/test scripts use (`src.sweep.generate_file`: memmap write,
+rename and checksum). Reports channels/s, µs per simulated slot, peak RSS, and
+the size of the result: bytes written (save) or bytes held in memory (memory).
+
+Each point runs in a fresh (spawned) process so peak RSS is per point, with a
+fixed seed and best-of---repeat timing. Results are written as JSON; pass
+--baseline with an earlier JSON to flag points whose channels/s dropped by more
+than --threshold (exit status 1). A baseline from another backend, backend
+version or dtype is refused (exit status 2).
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+BASELINE_POINT = {
+    "profile": "A",
+    "num_rbs": 10,
+    "spacing": 15,
+    "antennas": "1x1",
+    "slots_per_channel": 1,
+    "sos_num_sins": 32,
+    "sos_type": "Xiao",
+}
+SWEEP = {
+    "profile": ["A", "B", "C", "D", "E"],
+    "num_rbs": [10, 25, 52, 106],
+    "spacing": [15, 30, 60],
+    "antennas": ["1x1", "2x2", "4x4"],
+    "slots_per_channel": [1, 2, 4],
+    "sos_num_sins": [8, 16, 32, 64],
+    "sos_type": ["Xiao", "GMEDS1"],
+}
+MODES = ("memory", "save")
+# Baseline meta fields that must match for channels/s to be comparable, and fields that
+# only earn a warning when they differ.
+REQUIRED_META = ("backend", "backend_version", "dtype")
+WARN_META = ("num_channels", "repeat", "machine", "python", "numpy")
+
+
+def sweep_points(axes: list[str]) -> list[dict]:
+    """Baseline plus one-factor-at-a-time variations along each axis, without duplicates."""
+    points = [dict(BASELINE_POINT)]
+    for axis in axes:
+        for value in SWEEP[axis]:
+            point = {**BASELINE_POINT, axis: value}
+            if point not in points:
+                points.append(point)
+    return points
+
+
+def point_name(point: dict, mode: str) -> str:
+    return ",".join(f"{k}={v}" for k, v in point.items()) + f",mode={mode}"
+
+
+def _generation_kwargs(point: dict, num_channels: int, backend: str) -> dict:
+    rx, tx = (int(n) for n in point["antennas"].split("x"))  # Rx x Tx, as in benchmark_mimo.py
+    return {
+        "num_channels": num_channels,
+        "random_seed": 123,
+        "num_rbs": point["num_rbs"],
+        "spacing": point["spacing"],
+        "tx_antenna_count": tx,
+        "rx_antenna_count": rx,
+        "delay_spread": 300,
+        "doppler_shift": 100,
+        "profile": point["profile"],
+        "slots_per_channel": point["slots_per_channel"],
+        "sos_num_sins": point["sos_num_sins"],
+        "sos_type": point["sos_type"],
+        "backend": backend,
+        "show_progress": False,
+    }
+
+
+def _run_point(point: dict, mode: str, num_channels: int, backend: str, dtype: str, repeat: int) -> dict:
+    """Runs in a child process: time one point, return its measurements."""
+    from src.profiling import peak_rss_mb
+    from src.sweep import generate_file
+    from src.tdl import generate_tdl_channels
+
+    kwargs = _generation_kwargs(point, num_channels, backend)
+    seconds, nbytes = [], 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            if mode == "memory":
+                out = generate_tdl_channels(**kwargs, dtype=dtype)
+                nbytes = out.nbytes
+                del out
+            else:
+                path = Path(tmp) / "bench.npy"
+                generate_file({"path": str(path), "kwargs": {**kwargs, "dtype": dtype}, "entry": {}})
+                nbytes = path.stat().st_size
+            seconds.append(time.perf_counter() - start)
+    best = min(seconds)
+    slots = num_channels * point["slots_per_channel"]
+    return {
+        "seconds": best,
+        "channels_per_s": num_channels / best,
+        "us_per_slot": best / slots * 1e6,
+        "peak_rss_mb": peak_rss_mb(),
+        "bytes_in_memory" if mode == "memory" else "bytes_written": int(nbytes),
+    }
+
+
+def run_benchmark(axes, modes, num_channels, backend, dtype, repeat) -> dict:
+    from src.tdl import backend_version
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    points = sweep_points(axes)
+    total = len(points) * len(modes)
+    for point in points:
+        for mode in modes:
+            name = point_name(point, mode)
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_run_point, point, mode, num_channels, backend, dtype, repeat).result()
+            results[name] = {"params": point, "mode": mode, **result}
+            print(f"  [{len(results)}/{total}] {name}: {result['channels_per_s']:.1f} ch/s, "
+                  f"{result['us_per_slot']:.1f} us/slot, {result['peak_rss_mb']:.0f} MB")
+    return {
+        "meta": {
+            "backend": backend,
+            "backend_version": backend_version(backend),
+            "dtype": dtype,
+            "num_channels": num_channels,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def meta_mismatches(current: dict, baseline: dict, fields: tuple) -> list[str]:
+    """Descriptions of the meta fields that differ between two result JSONs."""
+    return [
+        f"{field}: baseline {baseline['meta'].get(field)!r}, current {current['meta'].get(field)!r}"
+        for field in fields
+        if baseline["meta"].get(field) != current["meta"].get(field)
+    ]
+
+
+def compare_to_baseline(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print the channels/s change per shared point; return the names that regressed."""
+    regressions = []
+    print(f"\n{'change':>8}  point")
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        change = result["channels_per_s"] / reference["channels_per_s"] - 1
+        regressed = change < -threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{change:>+8.1%}  {name}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark TDL channel generation throughput.")
+    parser.add_argument("-o", "--output", type=Path, default=Path("benchmark_tdl.json"),
+                        help="Where to write the JSON results (default: benchmark_tdl.json)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Allowed relative drop in channels/s before a point counts as a regression (default: 0.1)")
+    parser.add_argument("--axes", nargs="+", choices=list(SWEEP), default=list(SWEEP))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--num-channels", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", default="neoradium")
+    parser.add_argument("--dtype", default="complex128")
+    args = parser.parse_args()
+
+    current = run_benchmark(args.axes, args.modes, args.num_channels, args.backend, args.dtype, args.repeat)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatches = meta_mismatches(current, baseline, REQUIRED_META)
+        if mismatches:
+            print(f"Error: {args.baseline} is not comparable with this run:\n  " + "\n  ".join(mismatches))
+            sys.exit(2)
+        for mismatch in meta_mismatches(current, baseline, WARN_META):
+            print(f"Warning: baseline differs in {mismatch}")
+        regressions = compare_to_baseline(current, baseline, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+NMSE of the baseline channel estimators (LS, bilinear, nearest neighbour, LMMSE)
+over a generated dataset, typically the 9-group test set of generate_tdl_test_set.py.
+
+Files are scored in a process pool (--workers) through memory-mapped reads; the
+results table has one row per (group, delay spread, Doppler, SNR, estimator) and
+is printed and written as CSV. LMMSE filters are cached in --filter-cache. See
+src.estimation and src.lmmse.
+"""
+import argparse
+import csv
+from pathlib import Path
+
+from src.estimation import DEFAULT_SNRS, ESTIMATORS, evaluate_dataset
+from src.lmmse import DEFAULT_MAX_CACHE_BYTES
+from src.pilots import PilotPattern
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate baseline channel estimators on a TDL dataset.")
+    parser.add_argument(
+        "dataset",
+        type=Path,
+        nargs="?",
+        default=Path("output/tdl_test_set"),
+        help="Dataset folder (train layout or test-set root; default: output/tdl_test_set)",
+    )
+    parser.add_argument("-o", "--output", type=Path, default=Path("baseline_nmse.csv"),
+                        help="Where to write the results table (default: baseline_nmse.csv)")
+    parser.add_argument("--snrs", type=float, nargs="+", default=list(DEFAULT_SNRS), help="SNRs in dB")
+    parser.add_argument("--estimators", nargs="+", choices=ESTIMATORS, default=list(ESTIMATORS))
+    parser.add_argument("--pilot-symbols", type=int, nargs="+", default=[2, 11])
+    parser.add_argument("--pilot-every-n", type=int, default=2)
+    parser.add_argument("--max-channels-per-file", type=int, help="Only score the first N channels of each file")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of worker processes scoring files in parallel (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the LS noise (default: 0)")
+    parser.add_argument("--filter-cache", type=Path,
+                        help="Folder of cached LMMSE filters (default: ~/.cache/tdl_channels/lmmse_filters)")
+    parser.add_argument("--filter-cache-mb", type=int, default=DEFAULT_MAX_CACHE_BYTES >> 20,
+                        help="Evict least recently used LMMSE filters beyond this size (default: 1024)")
+    args = parser.parse_args()
+
+    # Use integer SNRs where possible so the table reads 10 rather than 10.0
+    snrs = [int(snr) if float(snr).is_integer() else snr for snr in args.snrs]
+    pattern = PilotPattern(pilot_symbols=tuple(args.pilot_symbols), pilot_every_n=args.pilot_every_n)
+    rows = evaluate_dataset(
+        args.dataset,
+        snrs=snrs,
+        estimators=tuple(args.estimators),
+        pattern=pattern,
+        workers=args.workers,
+        seed=args.seed,
+        max_channels_per_file=args.max_channels_per_file,
+        filter_cache=args.filter_cache,
+        max_cache_bytes=args.filter_cache_mb << 20,
+    )
+    if not rows:
+        parser.error(f"no generated files listed in the metadata.yaml files under {args.dataset}")
+
+    print(f"{'group':<32}{'delay':>7}{'doppler':>9}{'snr':>6}  {'estimator':<10}{'samples':>9}{'nmse dB':>9}")
+    for row in rows:
+        print(f"{row['group']:<32}{row['delay_spread_ns']:>7}{row['doppler_shift_hz']:>9}{row['snr_db']:>6}  "
+              f"{row['estimator']:<10}{row['samples']:>9}{row['nmse_db']:>9.2f}")
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,25 @@ Generate TDL test set organised into 9 subfolders — one per
 
 Each subfolder contains one .npy file for every (delay_spread, doppler_shift)
 pair drawn from its group, plus a metadata.yaml.
+
+Each pair is seeded from (random_seed, profile, delay_spread, doppler_shift), so
+the pairs of all groups can be generated in a process pool (--workers) with
+identical output.
+
+With --queue, any number of runs (on nodes sharing the output directory) split
+the pairs between them through lock files (see src.workqueue); once every pair
+is done, one of them writes metadata.yaml while holding the queue's merge claim.
 """
 import argparse
 import gc
 from itertools import product
 from pathlib import Path
 
-import numpy as np
-
-from src.tdl import generate_tdl_channels
-from src.utils import load_config, save_config
+from src.config import load_config, save_config
+from src.manifest import derive_seed
+from src.profiling import Profiler, format_summary, phase
+from src.sweep import OPTIONAL_KEYS, generate_file, run_build, run_queue, submit_file
+from src.tdl import storage_metadata
 
 DELAY_GROUPS = [
     ("low_delay",      "low_delay_spread"),
@@ -28,9 +37,8 @@ DOPPLER_GROUPS = [
 ]
 
 
-def _base_kwargs(config: dict) -> dict:
-    return {
-        "random_seed": config.get("random_seed", 123),
+def _base_kwargs(config: dict, workers: int = 1) -> dict:
+    kwargs = {
         "start_rb": config.get("start_rb", 0),
         "num_rbs": config.get("num_rbs", 10),
         "spacing": config.get("spacing", 15),
@@ -38,18 +46,43 @@ def _base_kwargs(config: dict) -> dict:
         "rx_antenna_count": config.get("rx_antenna_count", 1),
         "carrier_freq": config.get("carrier_freq", 3.5e9),
         "profile": config.get("delay_profile", "A"),
-        "show_progress": config.get("show_progress", True),
+        "backend": config.get("backend", "neoradium"),
+        "dtype": config.get("dtype", "complex128"),
+        "show_progress": config.get("show_progress", True) and workers <= 1,
     }
-
-
-def run(config_path: Path, output_dir: Path) -> None:
+    kwargs.update({key: config[key] for key in OPTIONAL_KEYS if key in config})
+    return kwargs
+
+
+def _generate_and_collect(job: dict) -> dict:
+    profiler = Profiler() if job.get("collect_timings") else None
+    entry = generate_file(job, profiler)
+    with phase(profiler, "gc_collect"):
+        gc.collect()
+    if profiler is not None:
+        entry["timings"] = profiler.to_dict()
+    return entry
+
+
+def run(
+    config_path: Path,
+    output_dir: Path,
+    workers: int = 1,
+    profile: bool = False,
+    queue: bool = False,
+    lease_timeout: float = 600.0,
+    write_buffers: int = 0,
+) -> None:
     config = load_config(config_path)
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    base = _base_kwargs(config)
+    base = _base_kwargs(config, workers)
+    random_seed = config.get("random_seed", 123)
     num_channels_per_group = config["num_channels_per_group"]
 
     groups = list(product(DELAY_GROUPS, DOPPLER_GROUPS))
+    jobs = []
+    folders = []
     for group_idx, ((delay_tag, delay_key), (doppler_tag, doppler_key)) in enumerate(groups, 1):
         delay_spreads = config[delay_key]
         doppler_shifts = config[doppler_key]
@@ -63,34 +96,60 @@ def run(config_path: Path, output_dir: Path) -> None:
         print(f"\n[{group_idx}/{len(groups)}] {folder_name}  "
               f"({len(pairs)} configs × {num_channels_per_config} channels)")
 
-        generated = []
-        for idx, (delay_spread, doppler_shift) in enumerate(pairs, 1):
-            name = f"delay_{delay_spread}_doppler_{doppler_shift}.npy"
-            print(f"  [{idx}/{len(pairs)}] {folder_name}/{name}")
-            channels = generate_tdl_channels(
-                **base,
-                num_channels=num_channels_per_config,
-                delay_spread=delay_spread,
-                doppler_shift=doppler_shift,
-            )
-            np.save(folder / name, channels)
-            del channels
-            gc.collect()
-            generated.append({
-                "file": name,
-                "delay_spread_ns": delay_spread,
-                "doppler_shift_hz": doppler_shift,
+        first_job = len(jobs)
+        for delay_spread, doppler_shift in pairs:
+            stem = f"delay_{delay_spread}_doppler_{doppler_shift}"
+            name = f"{stem}.npy"
+            seed = derive_seed(random_seed, base["profile"], delay_spread, doppler_shift)
+            jobs.append({
+                "path": str(folder / name),
+                "kwargs": {
+                    **base,
+                    "random_seed": seed,
+                    "num_channels": num_channels_per_config,
+                    "delay_spread": delay_spread,
+                    "doppler_shift": doppler_shift,
+                },
+                "entry": {
+                    "file": name,
+                    "delay_spread_ns": delay_spread,
+                    "doppler_shift_hz": doppler_shift,
+                    "random_seed": seed,
+                    "timestamps_file": f"{stem}_timestamps.npy",
+                },
+                "collect_timings": profile,
             })
-
-        save_config(folder / "metadata.yaml", {
+        folders.append((folder, {
             "config_path": str(Path(config_path).resolve()),
             "folder": folder_name,
             "num_channels_per_config": num_channels_per_config,
             "delay_spreads": delay_spreads,
             "doppler_shifts": doppler_shifts,
             "config": config,
-            "generated": generated,
-        })
+            "dtype": base["dtype"],
+            **storage_metadata(config.get("storage", "dense"), base["num_rbs"], base["spacing"]),
+        }, first_job, len(jobs)))
+
+    def save_metadata(results: list[dict]) -> None:
+        for folder, metadata, start, stop in folders:
+            save_config(folder / "metadata.yaml", {**metadata, "generated": results[start:stop]})
+
+    if queue:
+        results = run_queue(_generate_and_collect, jobs, output_dir, workers, lease_timeout,
+                            finish=save_metadata, outputs=tuple(folder / "metadata.yaml" for folder, *_ in folders))
+        if results is None:
+            print("All items done; metadata.yaml was written by the worker that merged the results")
+            return
+    else:
+        if write_buffers > 0:
+            results = run_build(submit_file, jobs, output_dir, workers, write_buffers)
+        else:
+            results = run_build(_generate_and_collect, jobs, output_dir, workers)
+        save_metadata(results)
+
+    timings = [entry["timings"] for entry in results if "timings" in entry]
+    if profile and timings:
+        print(format_summary(timings))
 
 
 def main() -> None:
@@ -111,8 +170,42 @@ def main() -> None:
         default=Path("output/tdl_test_set"),
         help="Output directory (default: output/tdl_test_set)",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes generating pairs in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-phase timings in metadata.yaml and print a summary table",
+    )
+    parser.add_argument(
+        "--queue",
+        action="store_true",
+        help="Claim pairs from a work queue in the output directory, so several runs "
+             "(e.g. on nodes sharing the output directory) build one dataset together",
+    )
+    parser.add_argument(
+        "--lease-timeout",
+        type=float,
+        default=600.0,
+        help="With --queue: seconds without a heartbeat after which a claimed pair is "
+             "reclaimed from a dead worker (default: 600)",
+    )
+    parser.add_argument(
+        "--write-buffers",
+        type=int,
+        default=0,
+        help="Write files on a background thread while the next pair is generated, with at "
+             "most this many buffers in flight (default: 0, write in place through a memmap)",
+    )
     args = parser.parse_args()
-    run(args.config, args.output)
+    if args.write_buffers > 0 and (args.workers > 1 or args.queue):
+        parser.error("--write-buffers applies to serial builds (without --workers or --queue)")
+    run(args.config, args.output, args.workers, args.profile, args.queue, args.lease_timeout, args.write_buffers)
 
 
 if __name__ == "__main__":
@@ -5,27 +5,75 @@ Generate TDL channel datasets from a YAML config.
 For each (delay_spread, max_doppler_shift) pair, generates num_channels_per_config
 channel matrices, saves them as .npy with a descriptive filename, and writes
 metadata.yaml in the output folder.
+
+Each pair is seeded from (random_seed, profile, delay_spread, doppler_shift), so
+the pairs can be generated in a process pool (--workers) with identical output.
+
+With a `trajectory` section in the config (length, num_trajectories), each pair is
+instead stored as num_trajectories continuous GMEDS1 time series of `length`
+captures; the config's named `windows` definitions are recorded in metadata.yaml
+for `src.trajectory.TrajectoryWindows`.
+
+With `doppler_sweep: shared` (numpy backend), all Doppler shifts of a delay spread
+share one fading draw and are generated together in one vectorized pass. Each
+file keeps the exact statistics of its Doppler shift, but the files are correlated
+across Doppler. The default `independent` seeds every pair separately.
+
+With --queue, any number of runs (on nodes sharing the output directory) split
+the pairs between them through lock files (see src.workqueue); once every pair
+is done, one of them writes metadata.yaml while holding the queue's merge claim.
 """
 import argparse
 from pathlib import Path
-import numpy as np
 
-from src.tdl import generate_tdl_channels
-from src.utils import load_config, save_config
+from src.config import load_config, save_config
+from src.manifest import derive_seed
+from src.profiling import format_summary
+from src.sweep import (
+    OPTIONAL_KEYS,
+    generate_doppler_group,
+    generate_file,
+    run_build,
+    run_queue,
+    submit_file,
+)
+from src.tdl import storage_metadata
+from src.trajectory import num_windows, spec_metadata, trajectory_settings, window_spec
+
+DOPPLER_SWEEPS = ("independent", "shared")
 
 
-def run(config_path: Path, output_dir: Path) -> None:
+def run(
+    config_path: Path,
+    output_dir: Path,
+    workers: int = 1,
+    profile: bool = False,
+    queue: bool = False,
+    lease_timeout: float = 600.0,
+    write_buffers: int = 0,
+) -> None:
     config = load_config(config_path)
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     delay_spreads = config["delay_spreads"]
     max_doppler_shifts = config["max_doppler_shifts"]
-    num_channels_per_config = config["num_channels_per_config"]
+    trajectory = trajectory_settings(config) if "trajectory" in config else None
+    doppler_sweep = config.get("doppler_sweep", "independent")
+    if doppler_sweep not in DOPPLER_SWEEPS:
+        raise ValueError(f"Unknown doppler_sweep {doppler_sweep!r}; expected one of {DOPPLER_SWEEPS}")
+    shared = doppler_sweep == "shared"
+    if shared and (config.get("backend", "neoradium") != "numpy" or queue or write_buffers > 0):
+        raise ValueError("doppler_sweep: shared needs backend: numpy and a plain build (no --queue or --write-buffers)")
+    windows = {name: window_spec(definition) for name, definition in (config.get("windows") or {}).items()}
+    for name, spec in windows.items():
+        if trajectory is None or num_windows(trajectory["length"], spec) == 0:
+            raise ValueError(f"Window definition {name!r} needs trajectories of at least window + horizon captures")
+    num_channels_per_config = trajectory["length"] if trajectory else config["num_channels_per_config"]
 
+    random_seed = config.get("random_seed", 123)
     base_kwargs = {
         "num_channels": num_channels_per_config,
-        "random_seed": config.get("random_seed", 123),
         "start_rb": config.get("start_rb", 0),
         "num_rbs": config.get("num_rbs", 10),
         "spacing": config.get("spacing", 15),
@@ -33,32 +81,82 @@ def run(config_path: Path, output_dir: Path) -> None:
         "rx_antenna_count": config.get("rx_antenna_count", 1),
         "carrier_freq": config.get("carrier_freq", 3.5e9),
         "profile": config.get("delay_profile", "A"),
-        "show_progress": config.get("show_progress", True),
+        "backend": config.get("backend", "neoradium"),
+        "dtype": config.get("dtype", "complex128"),
+        "show_progress": config.get("show_progress", True) and workers <= 1,
     }
+    base_kwargs.update({key: config[key] for key in OPTIONAL_KEYS if key in config})
+    if trajectory:
+        base_kwargs["sos_type"] = trajectory["sos_type"]
 
-    generated = []
+    jobs = []
     for delay_spread in delay_spreads:
         for doppler_shift in max_doppler_shifts:
-            name = f"delay_spread_{delay_spread}_doppler_{doppler_shift}.npy"
-            out_path = output_dir / name
-            channels = generate_tdl_channels(
-                **base_kwargs,
-                delay_spread=delay_spread,
-                doppler_shift=doppler_shift,
-            )
-            np.save(out_path, channels)
-            generated.append({
-                "file": name,
-                "delay_spread_ns": delay_spread,
-                "doppler_shift_hz": doppler_shift,
-            })
+            for index in range(trajectory["num_trajectories"]) if trajectory else [None]:
+                stem = f"delay_spread_{delay_spread}_doppler_{doppler_shift}"
+                keys = (base_kwargs["profile"], delay_spread)
+                if not shared:  # shared sweeps reuse one draw (seed) for every Doppler shift
+                    keys += (doppler_shift,)
+                if index is not None:
+                    stem = f"{stem}_trajectory_{index}"
+                    keys += ("trajectory", index)
+                name = f"{stem}.npy"
+                seed = derive_seed(random_seed, *keys)
+                entry = {
+                    "file": name,
+                    "delay_spread_ns": delay_spread,
+                    "doppler_shift_hz": doppler_shift,
+                    "random_seed": seed,
+                    "timestamps_file": f"{stem}_timestamps.npy",
+                }
+                if index is not None:
+                    entry["trajectory"] = index
+                jobs.append({
+                    "path": str(output_dir / name),
+                    "kwargs": {
+                        **base_kwargs,
+                        "random_seed": seed,
+                        "delay_spread": delay_spread,
+                        "doppler_shift": doppler_shift,
+                    },
+                    "entry": entry,
+                    "collect_timings": profile,
+                })
 
     metadata = {
         "config_path": str(Path(config_path).resolve()),
         "config": config,
-        "generated": generated,
+        "dtype": base_kwargs["dtype"],
+        **storage_metadata(config.get("storage", "dense"), base_kwargs["num_rbs"], base_kwargs["spacing"]),
     }
-    save_config(output_dir / "metadata.yaml", metadata)
+    if shared:
+        metadata["doppler_sweep"] = doppler_sweep
+    if trajectory:
+        metadata["trajectory"] = {**trajectory, "slots_per_channel": config.get("slots_per_channel", 1)}
+        metadata["windows"] = {name: spec_metadata(spec) for name, spec in windows.items()}
+
+    def save_metadata(generated: list[dict]) -> None:
+        save_config(output_dir / "metadata.yaml", {**metadata, "generated": generated})
+
+    if queue:
+        generated = run_queue(generate_file, jobs, output_dir, workers, lease_timeout,
+                              finish=save_metadata, outputs=(output_dir / "metadata.yaml",))
+        if generated is None:
+            print("All items done; metadata.yaml was written by the worker that merged the results")
+            return
+    else:
+        if write_buffers > 0:
+            generated = run_build(submit_file, jobs, output_dir, workers, write_buffers)
+        elif shared:
+            generated = run_build(generate_doppler_group, jobs, output_dir, workers,
+                                  group_by=lambda job: job["kwargs"]["random_seed"])
+        else:
+            generated = run_build(generate_file, jobs, output_dir, workers)
+        save_metadata(generated)
+
+    timings = [entry["timings"] for entry in generated if "timings" in entry]
+    if profile and timings:
+        print(format_summary(timings))
 
 
 def main() -> None:
@@ -79,8 +177,42 @@ def main() -> None:
         default=Path("output/tdl_dataset"),
         help="Output directory for .npy files and metadata.yaml (default: output/tdl_dataset)",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes generating pairs in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-phase timings in metadata.yaml and print a summary table",
+    )
+    parser.add_argument(
+        "--queue",
+        action="store_true",
+        help="Claim pairs from a work queue in the output directory, so several runs "
+             "(e.g. on nodes sharing the output directory) build one dataset together",
+    )
+    parser.add_argument(
+        "--lease-timeout",
+        type=float,
+        default=600.0,
+        help="With --queue: seconds without a heartbeat after which a claimed pair is "
+             "reclaimed from a dead worker (default: 600)",
+    )
+    parser.add_argument(
+        "--write-buffers",
+        type=int,
+        default=0,
+        help="Write files on a background thread while the next pair is generated, with at "
+             "most this many buffers in flight (default: 0, write in place through a memmap)",
+    )
     args = parser.parse_args()
-    run(args.config, args.output)
+    if args.write_buffers > 0 and (args.workers > 1 or args.queue):
+        parser.error("--write-buffers applies to serial builds (without --workers or --queue)")
+    run(args.config, args.output, args.workers, args.profile, args.queue, args.lease_timeout, args.write_buffers)
 
 
 if __name__ == "__main__":
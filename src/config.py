@@ -0,0 +1,32 @@
+"""
+YAML config and metadata I/O.
+
+Kept apart from the plotting helpers in src.utils so generation workers and
+dataset readers can load configs without importing matplotlib. Also holds
+`worker_id`, the per-process suffix of the temporary files every writer renames
+into place.
+"""
+import os
+import socket
+from pathlib import Path
+
+import yaml
+
+
+def worker_id() -> str:
+    """Host and PID of this process, unique across the nodes sharing an output folder."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def load_config(path: Path) -> dict:
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def save_config(path: Path, data: dict) -> None:
+    """Write data as YAML atomically (temporary file + rename), so readers never see a partial file."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{worker_id()}.tmp")
+    with open(tmp, "w") as f:
+        yaml.safe_dump(data, f, default_flow_style=False, sort_keys=False)
+    os.replace(tmp, path)
@@ -0,0 +1,263 @@
+"""
+Batched baseline channel estimators and NMSE evaluation over generated datasets.
+
+The estimators take the sparse LS grids of `src.pilots.ls_estimates`, shaped
+(B, K, L) in the notebooks' (subcarrier, symbol) orientation, and return full
+(B, K, L) estimates:
+
+  ls        the noisy LS estimates themselves; NMSE is measured at the pilots only
+  bilinear  `bilinear_channel_estimation` of the ls_bilinear notebook, batched:
+            linear across subcarriers, then piecewise linear across symbols
+  nearest   every resource element takes its nearest pilot in frequency and time
+  lmmse     one matrix product with the LMMSE filter of the file's TDL profile, delay
+            spread and Doppler at the SNR (`src.lmmse`, filters cached on disk)
+
+`bilinear` repeats the notebook's operations in the same order and dtype, so each
+sample matches the per-sample reference exactly (for the notebook's 1 to 3 pilot
+symbols; more symbols continue the piecewise-linear rule instead of leaving zeros).
+
+`evaluate_dataset` scores the estimators on every file of a dataset (train layout
+or the 9 test groups) in a process pool over memory-mapped files. It aggregates
+per-sample NMSE = mean|H_hat - H|^2 / mean|H|^2 per (group, delay spread, Doppler,
+SNR, estimator). LS noise is seeded per file, so results do not depend on the
+number of workers.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from src.config import load_config
+from src.lmmse import DEFAULT_MAX_CACHE_BYTES, FilterStore, default_filter_cache, lmmse_estimate
+from src.manifest import derive_seed
+from src.pilots import PilotPattern, ls_estimates, pilot_indices
+from src.reader import dataset_folders
+from src.tdl import storage_decoder, to_complex
+
+ESTIMATORS = ("ls", "bilinear", "nearest", "lmmse")
+DEFAULT_SNRS = (0, 5, 10, 15, 20, 25, 30)
+DEFAULT_CHUNK_SIZE = 1024
+
+
+def _pattern(pattern: PilotPattern) -> PilotPattern:
+    return pattern._replace(pilot_symbols=tuple(int(s) for s in pattern.pilot_symbols))
+
+
+def bilinear_estimate(grid: np.ndarray, pattern: PilotPattern = PilotPattern()) -> np.ndarray:
+    """Batched `bilinear_channel_estimation`: (B, K, L) sparse LS grid -> (B, K, L) estimate."""
+    subcarriers, symbols = pilot_indices(_pattern(pattern))
+    n = pattern.pilot_every_n
+    h = grid.copy()
+    num_symbols = h.shape[2]
+
+    # Frequency: linear between pilot subcarriers (the mean of both for every second
+    # subcarrier), then the last pilot repeated up to the band edge.
+    last = subcarriers[-1]
+    for r in range(1, n):
+        h[:, r:last:n, symbols] = (h[:, 0:last:n, symbols] * (n - r) + h[:, n:last + 1:n, symbols] * r) / n
+    h[:, last + 1:, symbols] = h[:, last:last + 1, symbols]
+
+    # Time: nearest (one pilot symbol) or piecewise linear inter/extrapolation
+    p = [int(s) for s in symbols]
+    if len(p) == 1:
+        h[:] = h[:, :, p[0]:p[0] + 1]
+        return h
+    slopes = [(h[:, :, b] - h[:, :, a]) / (b - a) for a, b in zip(p[:-1], p[1:])]
+    for i in range(num_symbols):
+        if i in p:
+            continue
+        if len(p) == 2:
+            segment, anchor = 0, p[0]  # the notebook extrapolates both sides from p0
+        elif i < p[0]:
+            segment, anchor = 0, p[0]
+        elif i > p[-1]:
+            segment, anchor = len(slopes) - 1, p[-1]
+        else:
+            segment = int(np.searchsorted(p, i)) - 1
+            anchor = p[segment]
+        h[:, :, i] = h[:, :, anchor] + slopes[segment] * (i - anchor)
+    return h
+
+
+@lru_cache(maxsize=32)
+def _nearest_indices(pattern: PilotPattern) -> tuple[np.ndarray, np.ndarray]:
+    subcarriers, symbols = pilot_indices(pattern)
+    # argmin returns the first minimum, so ties go to the lower subcarrier / earlier symbol
+    k = subcarriers[np.argmin(np.abs(np.arange(pattern.num_subcarriers)[:, None] - subcarriers), axis=1)]
+    l = symbols[np.argmin(np.abs(np.arange(pattern.num_symbols)[:, None] - symbols), axis=1)]
+    return k, l
+
+
+def nearest_estimate(grid: np.ndarray, pattern: PilotPattern = PilotPattern()) -> np.ndarray:
+    """Nearest-neighbour interpolation: (B, K, L) sparse LS grid -> (B, K, L) estimate."""
+    k, l = _nearest_indices(_pattern(pattern))
+    return grid[:, k[:, None], l[None, :]]
+
+
+def nmse(estimate: np.ndarray, channels: np.ndarray) -> np.ndarray:
+    """Per-sample NMSE of (B, ...) estimates against the true channels, in linear scale."""
+    axes = tuple(range(1, channels.ndim))
+    return np.mean(np.abs(estimate - channels) ** 2, axis=axes) / np.mean(np.abs(channels) ** 2, axis=axes)
+
+
+def estimator_nmse(
+    name: str,
+    channels: np.ndarray,
+    pilots: np.ndarray,
+    grid: np.ndarray,
+    pattern: PilotPattern = PilotPattern(),
+    filt: np.ndarray | None = None,
+) -> np.ndarray:
+    """Per-sample NMSE of one estimator; channels and grid are (B, K, L), pilots (B, Kp, Lp).
+
+    filt: the `src.lmmse.lmmse_filter` for this batch's sweep point and SNR (lmmse only).
+    """
+    if name == "ls":
+        subcarriers, symbols = pilot_indices(_pattern(pattern))
+        return nmse(pilots, channels[:, subcarriers[:, None], symbols[None, :]])
+    if name == "bilinear":
+        return nmse(bilinear_estimate(grid, pattern), channels)
+    if name == "nearest":
+        return nmse(nearest_estimate(grid, pattern), channels)
+    if name == "lmmse":
+        if filt is None:
+            raise ValueError("The lmmse estimator needs the filter of the channels' sweep point")
+        return nmse(lmmse_estimate(pilots, filt, pattern), channels)
+    raise ValueError(f"Unknown estimator {name!r}; expected one of {ESTIMATORS}")
+
+
+def evaluate_file(
+    path: Path,
+    seed: int,
+    snrs=DEFAULT_SNRS,
+    estimators=ESTIMATORS,
+    pattern: PilotPattern = PilotPattern(),
+    decoder=None,
+    max_channels: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    model: tuple | None = None,
+    filter_cache: Path | None = None,
+    max_cache_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+) -> dict:
+    """[sum of NMSE, sum of NMSE in dB, samples] per (snr, estimator) over one .npy file.
+
+    Every (Rx, Tx) antenna pair of a channel counts as one sample. The LS noise is drawn
+    from default_rng(seed), so a file always gets the same noise.
+    model: (profile, delay spread ns, Doppler Hz, subcarrier spacing kHz) of the file,
+        needed by lmmse, whose filters are kept in a `src.lmmse.FilterStore` at filter_cache.
+    """
+    data = np.load(path, mmap_mode="r")
+    stop = len(data) if max_channels is None else min(len(data), max_channels)
+    if data.shape[1] != pattern.num_symbols:
+        raise ValueError(f"{path}: {data.shape[1]} symbols per slot, pilot pattern expects {pattern.num_symbols}")
+    filters = {}
+    if "lmmse" in estimators:
+        if model is None or filter_cache is None:
+            raise ValueError("The lmmse estimator needs the file's model and a filter_cache folder")
+        profile, delay_spread, doppler_shift, spacing = model
+        store = FilterStore(filter_cache, max_cache_bytes)
+        filters = {snr: store.filter(profile, delay_spread, doppler_shift, snr, pattern, spacing) for snr in snrs}
+    rng = np.random.default_rng(seed)
+    totals = {(snr, name): [0.0, 0.0, 0] for snr in snrs for name in estimators}
+    for start in range(0, stop, chunk_size):
+        block = data[start:min(start + chunk_size, stop)]
+        block = to_complex(block if decoder is None else decoder(block))
+        # (N, L, K, Nr, Nt) -> (N * Nr * Nt, L, K)
+        if block.shape[2] != pattern.num_subcarriers:
+            raise ValueError(f"{path}: {block.shape[2]} subcarriers, pilot pattern expects {pattern.num_subcarriers}")
+        block = np.moveaxis(block.reshape(block.shape[:3] + (-1,)), -1, 1).reshape((-1,) + block.shape[1:3])
+        channels = block.transpose(0, 2, 1)
+        for snr in snrs:
+            pilots, grid = ls_estimates(block, snr, rng, pattern)
+            for name in estimators:
+                values = estimator_nmse(name, channels, pilots, grid, pattern, filters.get(snr))
+                total = totals[snr, name]
+                total[0] += float(values.sum())
+                total[1] += float(np.sum(10 * np.log10(values)))
+                total[2] += len(values)
+    return totals
+
+
+def _evaluate_file_job(args: tuple) -> dict:
+    return evaluate_file(*args)
+
+
+def evaluate_dataset(
+    root: Path,
+    snrs=DEFAULT_SNRS,
+    estimators=ESTIMATORS,
+    pattern: PilotPattern = PilotPattern(),
+    workers: int = 1,
+    seed: int = 0,
+    max_channels_per_file: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    filter_cache: Path | None = None,
+    max_cache_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+) -> list[dict]:
+    """NMSE of each estimator per (group, delay spread, Doppler, SNR) over a dataset.
+
+    The pilot pattern's num_subcarriers is taken from each folder's num_rbs, so only its
+    pilot layout matters. lmmse filters are cached in filter_cache (default: `src.lmmse.default_filter_cache`,
+    outside the dataset, so evaluation never writes into root).
+
+    Returns one row per combination with the number of samples, the mean NMSE (linear),
+    its value in dB and the mean of the per-sample NMSE in dB, sorted by group, delay
+    spread, Doppler, SNR and estimator.
+    """
+    root = Path(root)
+    for name in estimators:
+        if name not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator {name!r}; expected one of {ESTIMATORS}")
+    pattern = _pattern(pattern)
+    if filter_cache is None:
+        filter_cache = default_filter_cache()
+    jobs, keys = [], []
+    for folder in dataset_folders(root):
+        metadata = load_config(folder / "metadata.yaml")
+        group = folder.relative_to(root).as_posix()
+        config = metadata["config"]
+        folder_pattern = pattern._replace(num_subcarriers=12 * config.get("num_rbs", 10))
+        for entry in metadata["generated"]:
+            path = folder / entry["file"]
+            seed_i = derive_seed(seed, path.relative_to(root).as_posix())
+            jobs.append((path, seed_i, tuple(snrs), tuple(estimators), folder_pattern,
+                         storage_decoder(metadata, entry), max_channels_per_file, chunk_size,
+                         (config.get("delay_profile", "A"), entry["delay_spread_ns"], entry["doppler_shift_hz"],
+                          config.get("spacing", 15)),
+                         filter_cache, max_cache_bytes))
+            keys.append((group, entry["delay_spread_ns"], entry["doppler_shift_hz"]))
+
+    if workers <= 1:
+        parts = map(_evaluate_file_job, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        parts = pool.map(_evaluate_file_job, jobs)
+    aggregated = {}
+    try:
+        for key, totals in zip(keys, parts):
+            for (snr, name), (nmse_sum, nmse_db_sum, count) in totals.items():
+                total = aggregated.setdefault(key + (snr, name), [0.0, 0.0, 0])
+                total[0] += nmse_sum
+                total[1] += nmse_db_sum
+                total[2] += count
+    finally:
+        if workers > 1:
+            pool.shutdown()
+
+    rows = []
+    for (group, delay_spread, doppler_shift, snr, name), (nmse_sum, nmse_db_sum, count) in sorted(
+        aggregated.items(), key=lambda item: item[0][:4] + (estimators.index(item[0][4]),)
+    ):
+        rows.append({
+            "group": group,
+            "delay_spread_ns": delay_spread,
+            "doppler_shift_hz": doppler_shift,
+            "snr_db": snr,
+            "estimator": name,
+            "samples": count,
+            "nmse": nmse_sum / count,
+            "nmse_db": float(10 * np.log10(nmse_sum / count)),
+            "mean_sample_nmse_db": nmse_db_sum / count,
+        })
+    return rows
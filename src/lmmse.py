@@ -0,0 +1,221 @@
+"""
+LMMSE channel estimation from the TDL model's second-order statistics.
+
+The channel covariance over the (subcarrier, symbol) grid is modelled with a
+Kronecker structure R = R_f ⊗ R_t:
+
+  R_f[k, k']  frequency correlation, the Fourier transform of the power-delay
+              profile: sum_p P_p exp(-j2π (f_k - f_k') τ_p) / sum_p P_p
+  R_t[l, l']  time correlation across the OFDM symbols of a slot, Clarke/Jakes
+              J0(2π f_D Δt). For the LOS profiles D and E the first tap adds its
+              LOS term exp(j2π 0.7 f_D Δt) (as `src.tdl_native` does) and R_t is
+              the power-weighted mean over taps
+
+R is exact for the NLOS profiles A to C. For D and E, whose LOS tap has its own
+time correlation, it keeps the exact frequency and time marginals. Channels are
+assumed normalized to unit mean power, as the generator scripts store them, and
+the LS noise variance at an SNR is 10^(-SNR/10) as in `src.pilots.ls_estimates`.
+
+The pilot covariance R_f[Kp, Kp] ⊗ R_t[Lp, Lp] is diagonalized through the
+eigendecompositions of its two small factors. Each SNR therefore only rescales
+the eigenvalues, and the dense (K*L, Kp*Lp) filter is applied to a whole batch
+with one matrix product. Filters are keyed by (profile, delay spread, Doppler,
+subcarrier spacing, pilot pattern, SNR). `FilterStore` keeps them as .npy files
+and evicts the least recently used ones beyond a size limit.
+
+The filters assume the numpy backend's delay origin: tap delays are measured from
+the first tap, as in `src.tdl_native`. NeoRadium instead moves each slot's origin
+to the strongest sample of that slot's channel impulse response (its timing offset,
+`chanOffset`). The origin then depends on the fading of each realization, so no
+fixed delay shift of the model reproduces it. On `backend: neoradium` data |R_f|
+still matches, but the empirical phase slope is roughly halved (profile A, 100 ns:
+Cf[0, 10] = 1.01+0.038j against the model's 0.992+0.083j). The model covariance is
+then about 20% off, and LMMSE comes out 0.2-0.5 dB worse than it does on numpy data.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from src.config import worker_id
+from src.pilots import PilotPattern, pilot_indices
+from src.tdl_native import SYMBOLS_PER_SLOT, subcarrier_frequencies, symbol_times, tdl_taps
+
+MODEL_VERSION = 1  # bump whenever the covariance model or the filters change
+FILTER_CACHE_NAME = "lmmse_filters"
+DEFAULT_MAX_CACHE_BYTES = 1 << 30
+DEFAULT_MAX_MEMORY_FILTERS = 32  # in-process filters kept per FilterStore (~3 MB each for 10 RBs)
+LOS_DOPPLER_FACTOR = 0.7  # LOS Doppler relative to f_D, as in src.tdl_native
+
+
+def default_filter_cache() -> Path:
+    """Per-user filter folder ($XDG_CACHE_HOME or ~/.cache), shared by every dataset.
+
+    Filter keys hold every model input, so one folder serves all datasets, and evaluating
+    a dataset never writes into it.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "tdl_channels" / FILTER_CACHE_NAME
+
+
+def bessel_j0(x: np.ndarray) -> np.ndarray:
+    """Bessel function J0 via the midpoint rule on (1/π) ∫_0^π cos(x sin θ) dθ.
+
+    The integrand is smooth and periodic, so 64 nodes are exact to double precision
+    for |x| up to about 40 (2π f_D Δt stays below 10 within a slot).
+    """
+    theta = np.pi * (np.arange(64) + 0.5) / 64
+    return np.cos(np.multiply.outer(np.asarray(x, dtype=np.float64), np.sin(theta))).mean(-1)
+
+
+def frequency_correlation(profile: str, delay_spread: float, num_subcarriers: int, spacing: int = 15) -> np.ndarray:
+    """R_f of a TDL profile over the subcarrier grid, shape (K, K), unit diagonal."""
+    delays, powers, _ = tdl_taps(profile, delay_spread)
+    freqs = subcarrier_frequencies(num_subcarriers // 12, spacing)
+    kernel = np.exp(-2j * np.pi * (freqs[:, None] - freqs[None, :])[..., None] * delays)   # (K, K, P)
+    return kernel @ powers / powers.sum()
+
+
+def time_correlation(profile: str, delay_spread: float, doppler_shift: float, spacing: int = 15) -> np.ndarray:
+    """R_t across the symbols of a slot, shape (L, L), unit diagonal."""
+    _, powers, k_factor = tdl_taps(profile, delay_spread)
+    times = symbol_times(np.zeros(1, dtype=np.int64), spacing)[0]
+    lag = times[:, None] - times[None, :]
+    rayleigh = bessel_j0(2 * np.pi * doppler_shift * lag)
+    if k_factor is None:
+        return rayleigh.astype(np.complex128)
+    los = np.exp(2j * np.pi * LOS_DOPPLER_FACTOR * doppler_shift * lag)
+    los_share = powers[0] / powers.sum() * k_factor / (k_factor + 1)
+    return rayleigh + los_share * (los - rayleigh)
+
+
+@lru_cache(maxsize=64)
+def _kronecker_factors(
+    profile: str,
+    delay_spread: float,
+    doppler_shift: float,
+    spacing: int,
+    pattern: PilotPattern,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """SNR-independent part of the filter: (A, eigenvalues, U) with R_pp = U diag(λ) U^H
+    and R_hp U = A, for the Kronecker covariance of one sweep point."""
+    if pattern.num_symbols != SYMBOLS_PER_SLOT:
+        raise ValueError(f"LMMSE needs {SYMBOLS_PER_SLOT} symbols per slot, the pattern has {pattern.num_symbols}")
+    subcarriers, symbols = pilot_indices(pattern)
+    r_f = frequency_correlation(profile, delay_spread, pattern.num_subcarriers, spacing)
+    r_t = time_correlation(profile, delay_spread, doppler_shift, spacing)
+    eig_f, u_f = np.linalg.eigh(r_f[np.ix_(subcarriers, subcarriers)])
+    eig_t, u_t = np.linalg.eigh(r_t[np.ix_(symbols, symbols)])
+    a_f = r_f[:, subcarriers] @ u_f
+    a_t = r_t[:, symbols] @ u_t
+    return np.kron(a_f, a_t), np.kron(np.maximum(eig_f, 0), np.maximum(eig_t, 0)), np.kron(u_f, u_t)
+
+
+def lmmse_filter(
+    profile: str,
+    delay_spread: float,
+    doppler_shift: float,
+    snr_db: float,
+    pattern: PilotPattern = PilotPattern(),
+    spacing: int = 15,
+) -> np.ndarray:
+    """W = R_hp (R_pp + σ² I)^-1, shape (K*L, Kp*Lp), mapping flattened (Kp, Lp) pilots
+    to the flattened (K, L) grid."""
+    pattern = pattern._replace(pilot_symbols=tuple(int(s) for s in pattern.pilot_symbols))
+    a, eigenvalues, u = _kronecker_factors(profile, float(delay_spread), float(doppler_shift), spacing, pattern)
+    noise_variance = 10 ** (-float(snr_db) / 10)
+    return (a / (eigenvalues + noise_variance)) @ u.conj().T
+
+
+def lmmse_estimate(pilots: np.ndarray, filt: np.ndarray, pattern: PilotPattern = PilotPattern()) -> np.ndarray:
+    """Apply a filter of `lmmse_filter` to LS pilots (B, Kp, Lp) -> (B, K, L) in one product."""
+    batch = len(pilots)
+    estimate = pilots.reshape(batch, -1) @ filt.T.astype(pilots.dtype, copy=False)
+    return estimate.reshape(batch, pattern.num_subcarriers, pattern.num_symbols)
+
+
+class FilterStore:
+    """LMMSE filters on disk, one .npy per (sweep point, pilot pattern, SNR), LRU-evicted.
+
+    Lookups hit an in-process LRU of at most max_memory_filters filters first, then the
+    folder, and only build a filter on a miss. Every disk hit refreshes the file's mtime.
+    After each write the least recently used files are removed until the folder holds at
+    most max_bytes. Files are written to a temporary name and renamed, so processes on
+    any node may share one folder.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+                 max_memory_filters: int = DEFAULT_MAX_MEMORY_FILTERS):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_memory_filters = max_memory_filters
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._memory = OrderedDict()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(profile: str, delay_spread: float, doppler_shift: float, snr_db: float,
+            pattern: PilotPattern, spacing: int = 15) -> str:
+        fields = {
+            "version": MODEL_VERSION,
+            "profile": profile,
+            "delay_spread": float(delay_spread),
+            "doppler_shift": float(doppler_shift),
+            "snr_db": float(snr_db),
+            "spacing": int(spacing),
+            "pattern": [[int(s) for s in pattern.pilot_symbols], *pattern[1:]],
+        }
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:24]
+
+    def filter(
+        self,
+        profile: str,
+        delay_spread: float,
+        doppler_shift: float,
+        snr_db: float,
+        pattern: PilotPattern = PilotPattern(),
+        spacing: int = 15,
+    ) -> np.ndarray:
+        """Cached `lmmse_filter` (read-only)."""
+        key = self.key(profile, delay_spread, doppler_shift, snr_db, pattern, spacing)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        path = self.root / f"{key}.npy"
+        try:
+            filt = np.load(path)
+            os.utime(path)
+            self.hits += 1
+        except (FileNotFoundError, ValueError, EOFError):  # absent, evicted or truncated
+            filt = lmmse_filter(profile, delay_spread, doppler_shift, snr_db, pattern, spacing)
+            self.misses += 1
+            tmp = path.with_name(f".{path.name}.{worker_id()}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, filt)
+            os.replace(tmp, path)
+            self.evict()
+        filt.flags.writeable = False
+        self._memory[key] = filt
+        while len(self._memory) > self.max_memory_filters:
+            self._memory.popitem(last=False)
+        return filt
+
+    def evict(self) -> None:
+        """Remove least recently used filters until the folder fits in max_bytes."""
+        files = []
+        for path in self.root.glob("*.npy"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,69 @@
+"""
+Content-addressed manifest for resumable dataset builds.
+
+Every output file is keyed by a hash of its full effective generation parameters.
+manifest.yaml in the output folder maps each file (relative path) to that key and
+to the SHA-256 of the file written for it. A rerun skips files whose key and
+checksum both still match and regenerates the missing, stale or corrupt ones.
+
+Also home to `derive_seed`, the other hash helper shared by generation, streaming and
+evaluation; this module only depends on the YAML helpers, so all of them can import it.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from src.config import load_config, save_config
+
+MANIFEST_NAME = "manifest.yaml"
+
+
+def params_key(params: dict) -> str:
+    """Stable hash of a parameter dict (order-independent, YAML/JSON scalar values)."""
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def derive_seed(base_seed: int, *keys) -> int:
+    """Derive a 32-bit seed for one sweep point from the config seed and the point's keys.
+
+    The seed depends only on the values (e.g. profile, delay spread, Doppler), never on the
+    position of the point in the grid or on which worker runs it, so a sweep produces the
+    same files whether it runs serially or in a process pool.
+    """
+    text = ":".join(str(k) for k in (base_seed, *keys))
+    digest = hashlib.sha256(text.encode()).digest()
+    return int.from_bytes(digest[:4], "little")
+
+
+def file_sha256(path: Path, block_size: int = 1 << 24) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir: Path) -> dict:
+    """Return {relative file path: {"key": ..., "sha256": ...}} (empty if no manifest yet)."""
+    path = Path(output_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    return (load_config(path) or {}).get("files", {})
+
+
+def save_manifest(output_dir: Path, files: dict) -> None:
+    """Write manifest.yaml atomically (see `src.config.save_config`)."""
+    save_config(Path(output_dir) / MANIFEST_NAME, {"files": files})
+
+
+def is_current(output_dir: Path, rel_path: str, key: str, files: dict) -> bool:
+    """True if rel_path exists, was built from key, and still matches its recorded checksum."""
+    record = files.get(rel_path)
+    path = Path(output_dir) / rel_path
+    return (
+        record is not None
+        and record.get("key") == key
+        and path.exists()
+        and file_sha256(path) == record.get("sha256")
+    )
@@ -0,0 +1,97 @@
+"""
+Batched pilot extraction and LS-noise augmentation.
+
+Vectorized replacement for the per-sample `TDLDataset._get_LS_estimate_at_pilots`
+in the example notebooks: one call takes a whole batch of channels, a pilot pattern
+and a per-sample SNR vector, and returns the noisy LS estimates at the pilots plus
+the sparse masked grid. Outputs use the notebooks' (subcarrier, symbol) orientation,
+i.e. pilots are (B, Kp, Lp) and grids are (B, K, L).
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+
+class PilotPattern(NamedTuple):
+    pilot_symbols: tuple = (2, 11)
+    pilot_every_n: int = 2
+    num_subcarriers: int = 120
+    num_symbols: int = 14
+
+
+@lru_cache(maxsize=32)
+def pilot_indices(pattern: PilotPattern) -> tuple[np.ndarray, np.ndarray]:
+    """Cached gather indices (pilot subcarriers (Kp,), pilot symbols (Lp,)) for a pattern."""
+    subcarriers = np.arange(0, pattern.num_subcarriers, pattern.pilot_every_n)
+    symbols = np.asarray(pattern.pilot_symbols, dtype=np.int64)
+    subcarriers.flags.writeable = False
+    symbols.flags.writeable = False
+    return subcarriers, symbols
+
+
+def worker_rng(seed: int, worker_id: int = 0) -> np.random.Generator:
+    """Independent, reproducible generator for one DataLoader worker."""
+    return np.random.default_rng([seed, worker_id])
+
+
+def ls_estimates(
+    channels: np.ndarray,
+    snr_db: np.ndarray,
+    rng: np.random.Generator,
+    pattern: PilotPattern = PilotPattern(),
+    *,
+    return_grid: bool = True,
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """LS channel estimates at the pilots for a batch of channels.
+
+    channels: (B, L, K) complex, as stored on disk (after squeezing Nr, Nt).
+    snr_db: per-sample SNR in dB, shape (B,) (or a scalar for the whole batch).
+    With unit symbol and channel power the LS error variance is 10^(-SNR/10).
+
+    Returns (pilot estimates (B, Kp, Lp), sparse grid (B, K, L) with the noisy pilots
+    and zeros elsewhere, or None if return_grid is False).
+    """
+    channels = np.asarray(channels)
+    batch = len(channels)
+    pattern = pattern._replace(pilot_symbols=tuple(pattern.pilot_symbols))
+    subcarriers, symbols = pilot_indices(pattern)
+    dtype = np.result_type(channels.dtype, np.complex64)
+
+    # (B, Lp, Kp) gather, then to (B, Kp, Lp)
+    pilots = channels[:, symbols[:, None], subcarriers[None, :]].transpose(0, 2, 1).astype(dtype)
+
+    noise_std = np.sqrt(10 ** (-np.broadcast_to(np.asarray(snr_db, dtype=np.float64), (batch,)) / 10) / 2)
+    noise = rng.standard_normal((batch, len(subcarriers), len(symbols), 2))
+    noise *= noise_std[:, None, None, None]
+    pilots += (noise[..., 0] + 1j * noise[..., 1]).astype(dtype)
+
+    grid = None
+    if return_grid:
+        grid = np.zeros((batch, pattern.num_subcarriers, pattern.num_symbols), dtype=dtype)
+        grid[:, subcarriers[:, None], symbols[None, :]] = pilots
+    return pilots, grid
+
+
+class LSAugmenter:
+    """Draws per-sample SNRs from a list and applies `ls_estimates` to whole batches.
+
+    Typical use is as (part of) a DataLoader collate_fn, with one seeded generator
+    per worker (see `worker_rng`).
+    """
+
+    def __init__(
+        self,
+        snrs=(0, 5, 10, 15, 20, 25, 30),
+        pattern: PilotPattern = PilotPattern(),
+        rng: np.random.Generator | None = None,
+    ):
+        self.snrs = np.asarray(snrs, dtype=np.float64)
+        self.pattern = pattern._replace(pilot_symbols=tuple(pattern.pilot_symbols))
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def __call__(self, channels: np.ndarray, return_grid: bool = True):
+        """Returns (pilot estimates, sparse grid or None, per-sample SNRs (B,))."""
+        snr_db = self.rng.choice(self.snrs, size=len(channels))
+        pilots, grid = ls_estimates(channels, snr_db, self.rng, self.pattern, return_grid=return_grid)
+        return pilots, grid, snr_db
@@ -0,0 +1,79 @@
+"""
+Lightweight per-phase timing for dataset builds.
+
+A `Profiler` accumulates wall time, call counts and the process peak RSS seen at
+the end of each named phase. Instrumented code calls `phase(profiler, name)`,
+which is a shared no-op context when profiler is None, so the hooks cost nothing
+when profiling is off and about a microsecond per call when it is on.
+"""
+import resource
+import sys
+from contextlib import nullcontext
+from time import perf_counter
+
+_NO_PHASE = nullcontext()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    def __init__(self):
+        self.phases = {}  # name -> [seconds, calls, peak_rss_mb]
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = [0.0, 0, 0.0]
+        stats[0] += seconds
+        stats[1] += 1
+        stats[2] = max(stats[2], peak_rss_mb())
+
+    def to_dict(self) -> dict:
+        """{phase: {"seconds", "calls", "peak_rss_mb"}}, in first-seen order (YAML friendly)."""
+        return {
+            name: {"seconds": round(seconds, 6), "calls": calls, "peak_rss_mb": round(peak, 1)}
+            for name, (seconds, calls, peak) in self.phases.items()
+        }
+
+
+def phase(profiler: Profiler | None, name: str):
+    """Context timing one call of phase name, or a no-op if profiler is None."""
+    return _NO_PHASE if profiler is None else profiler.phase(name)
+
+
+def format_summary(timings: list[dict]) -> str:
+    """Table of per-phase totals over several `Profiler.to_dict()` results (e.g. one per file)."""
+    totals = {}
+    for timing in timings:
+        for name, stats in timing.items():
+            seconds, calls, peak = totals.get(name, (0.0, 0, 0.0))
+            totals[name] = (seconds + stats["seconds"], calls + stats["calls"], max(peak, stats["peak_rss_mb"]))
+    total_seconds = sum(seconds for seconds, _, _ in totals.values()) or 1.0
+    lines = [f"{'phase':<20} {'seconds':>10} {'share':>7} {'calls':>10} {'us/call':>10} {'peak MB':>9}"]
+    for name, (seconds, calls, peak) in sorted(totals.items(), key=lambda item: -item[1][0]):
+        lines.append(f"{name:<20} {seconds:>10.3f} {seconds / total_seconds:>7.1%} {calls:>10d} "
+                     f"{seconds / max(calls, 1) * 1e6:>10.1f} {peak:>9.1f}")
+    return "\n".join(lines)
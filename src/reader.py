@@ -0,0 +1,145 @@
+"""
+Memory-mapped reader over a generated TDL dataset.
+
+Builds one global sample index from metadata.yaml instead of loading every .npy:
+sample i maps to (file, offset, delay_spread, doppler_shift). Shards are opened with
+mmap_mode='r', so startup only reads .npy headers and resident memory is bounded
+by the pages actually touched. Works for the flat train layout (metadata.yaml in
+the root) and the test layout (one subfolder with its own metadata.yaml per group),
+including files with different numbers of channels. Files stored as tap gains
+(storage: taps in metadata.yaml) are decoded to channel matrices on read.
+"""
+from pathlib import Path
+
+import numpy as np
+
+from src.config import load_config
+from src.tdl import storage_decoder, to_complex
+
+
+def dataset_folders(root: Path) -> list[Path]:
+    """Folders holding a metadata.yaml: [root] for the train layout, the group folders for the test layout."""
+    root = Path(root)
+    if (root / "metadata.yaml").exists():
+        return [root]
+    folders = sorted(p.parent for p in root.glob("*/metadata.yaml"))
+    if not folders:
+        raise FileNotFoundError(f"No metadata.yaml found in {root} or its subfolders")
+    return folders
+
+
+class TDLShardReader:
+    def __init__(self, root: Path, *, as_complex: bool = True):
+        """
+        root: dataset folder (train layout) or parent of the group folders (test layout).
+        as_complex: convert float16 (real, imag) pairs to complex64 on read; complex
+            files are always returned in their stored dtype.
+        """
+        self.root = Path(root)
+        self.as_complex = as_complex
+        folders = dataset_folders(self.root)
+
+        self.files = []
+        self.shards = []
+        self.timestamp_files = []
+        self.decoders = []
+        self._timestamps = {}
+        delay_spreads, doppler_shifts, lengths = [], [], []
+        for folder in folders:
+            metadata = load_config(folder / "metadata.yaml")
+            for entry in metadata["generated"]:
+                path = folder / entry["file"]
+                shard = np.load(path, mmap_mode="r")
+                self.files.append(path)
+                self.shards.append(shard)
+                self.decoders.append(storage_decoder(metadata, entry))
+                times_name = entry.get("timestamps_file")
+                self.timestamp_files.append(folder / times_name if times_name else None)
+                delay_spreads.append(entry["delay_spread_ns"])
+                doppler_shifts.append(entry["doppler_shift_hz"])
+                lengths.append(len(shard))
+
+        self.file_delay_spread = np.array(delay_spreads)
+        self.file_doppler_shift = np.array(doppler_shifts)
+        self.file_lengths = np.array(lengths, dtype=np.int64)
+        self.file_starts = np.concatenate(([0], np.cumsum(self.file_lengths)[:-1]))
+        # One file id per sample gives O(1) lookup (4 bytes per sample).
+        self.sample_file = np.repeat(np.arange(len(self.files), dtype=np.int32), self.file_lengths)
+
+    def __len__(self) -> int:
+        return len(self.sample_file)
+
+    def locate(self, indices) -> tuple[np.ndarray, np.ndarray]:
+        """Map global sample indices to (file ids, offsets within file)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        file_ids = self.sample_file[indices]
+        return file_ids, indices - self.file_starts[file_ids]
+
+    def index(self, idx: int) -> dict:
+        """Global sample -> {"file", "offset", "delay_spread", "doppler_shift"}."""
+        file_id, offset = self.locate(idx)
+        return {
+            "file": self.files[file_id],
+            "offset": int(offset),
+            "delay_spread": self.file_delay_spread[file_id].item(),
+            "doppler_shift": self.file_doppler_shift[file_id].item(),
+        }
+
+    def get_timestamps(self, indices) -> np.ndarray:
+        """Capture time in seconds of each sample (from the per-file *_timestamps.npy)."""
+        file_ids, offsets = self.locate(indices)
+        out = np.empty(file_ids.shape, dtype=np.float64)
+        for file_id in np.unique(file_ids):
+            if file_id not in self._timestamps:
+                path = self.timestamp_files[file_id]
+                if path is None:
+                    raise ValueError(f"{self.files[file_id]} was generated without timestamps")
+                self._timestamps[file_id] = np.load(path, mmap_mode="r")
+            mask = file_ids == file_id
+            out[mask] = self._timestamps[file_id][offsets[mask]]
+        return out
+
+    def _convert(self, data: np.ndarray) -> np.ndarray:
+        return to_complex(data) if self.as_complex else data
+
+    def _decode(self, file_id: int, data: np.ndarray) -> np.ndarray:
+        decoder = self.decoders[file_id]
+        return np.asarray(data) if decoder is None else decoder(data)
+
+    def __getitem__(self, idx: int) -> np.ndarray:
+        file_id, offset = self.locate(idx)
+        return self._convert(self._decode(file_id, self.shards[file_id][offset:offset + 1])[0])
+
+    def get_slice(self, start: int, stop: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Contiguous samples [start, stop), possibly spanning several files.
+
+        Returns (channels (stop - start, ...), delay_spreads, doppler_shifts), as `get_batch`.
+        """
+        return self.get_batch(np.arange(start, stop))
+
+    def get_batch(self, indices) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gather samples for arbitrary global indices.
+
+        Indices are grouped per file and read in sorted order (a single slice when they are
+        contiguous), then scattered back into request order.
+        Returns (channels (B, ...), delay_spreads (B,), doppler_shifts (B,)).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        file_ids, offsets = self.locate(indices)
+        first = self._decode(0, self.shards[0][:0])
+        out = np.empty((len(indices),) + first.shape[1:], dtype=first.dtype)
+        for file_id in np.unique(file_ids):
+            positions = np.flatnonzero(file_ids == file_id)
+            order = np.argsort(offsets[positions], kind="stable")
+            positions = positions[order]
+            rows = offsets[positions]
+            shard = self.shards[file_id]
+            if rows[-1] - rows[0] == len(rows) - 1 and np.all(np.diff(rows) == 1):
+                out[positions] = self._decode(file_id, shard[rows[0]:rows[-1] + 1])
+            else:
+                out[positions] = self._decode(file_id, shard[rows])
+        return (
+            self._convert(out),
+            self.file_delay_spread[file_ids],
+            self.file_doppler_shift[file_ids],
+        )
@@ -0,0 +1,198 @@
+"""
+Single-pass streaming statistics over generated TDL datasets.
+
+`ChannelStats` is a mergeable accumulator: each chunk is reduced with NumPy and
+folded in with the parallel (Chan et al.) form of Welford's update, so results
+are exact regardless of how the data is split across chunks, files or processes.
+It tracks real/imag mean and variance, mean power, power per OFDM symbol, per
+subcarrier and per delay tap (IFFT across subcarriers).
+
+`dataset_statistics` runs it over memory-mapped .npy files in constant memory and
+caches each folder's accumulator in stats.yaml next to its metadata.yaml.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from src.config import load_config, save_config
+from src.manifest import params_key
+from src.reader import dataset_folders
+from src.tdl import storage_decoder, to_complex
+
+STATS_NAME = "stats.yaml"
+DEFAULT_CHUNK_SIZE = 1024
+
+
+def _merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    n = n_a + n_b
+    if n == 0:
+        return 0.0, 0.0
+    delta = mean_b - mean_a
+    return mean_a + delta * n_b / n, m2_a + m2_b + delta**2 * n_a * n_b / n
+
+
+class ChannelStats:
+    _ARRAYS = ("symbol_power_sum", "subcarrier_power_sum", "delay_power_sum")
+
+    def __init__(self):
+        self.count = 0                     # number of complex values
+        self.real_mean = self.real_m2 = 0.0
+        self.imag_mean = self.imag_m2 = 0.0
+        self.power_sum = 0.0
+        self.symbol_power_sum = None       # (L,)
+        self.subcarrier_power_sum = None   # (K,)
+        self.delay_power_sum = None        # (K,) delay bins of 1 / (K * spacing)
+
+    def update(self, block: np.ndarray) -> "ChannelStats":
+        """Fold in a block of channels of shape (n, L, K, ...)."""
+        block = np.asarray(to_complex(block), dtype=np.complex128)
+        if block.size == 0:
+            return self
+        other = ChannelStats()
+        other.count = block.size
+        real, imag = block.real, block.imag
+        other.real_mean, other.imag_mean = real.mean(), imag.mean()
+        other.real_m2 = np.sum((real - other.real_mean) ** 2)
+        other.imag_m2 = np.sum((imag - other.imag_mean) ** 2)
+        power = block.real**2 + block.imag**2
+        other.power_sum = power.sum()
+        rest = tuple(range(3, block.ndim))
+        other.symbol_power_sum = power.sum(axis=(0, 2) + rest)
+        other.subcarrier_power_sum = power.sum(axis=(0, 1) + rest)
+        taps = np.fft.ifft(block, axis=2, norm="ortho")
+        other.delay_power_sum = (taps.real**2 + taps.imag**2).sum(axis=(0, 1) + rest)
+        return self.merge(other)
+
+    def merge(self, other: "ChannelStats") -> "ChannelStats":
+        """Fold another accumulator into this one (in place) and return self."""
+        self.real_mean, self.real_m2 = _merge_moments(
+            self.count, self.real_mean, self.real_m2, other.count, other.real_mean, other.real_m2)
+        self.imag_mean, self.imag_m2 = _merge_moments(
+            self.count, self.imag_mean, self.imag_m2, other.count, other.imag_mean, other.imag_m2)
+        self.count += other.count
+        self.power_sum += other.power_sum
+        for name in self._ARRAYS:
+            mine, theirs = getattr(self, name), getattr(other, name)
+            if theirs is not None:
+                setattr(self, name, theirs.copy() if mine is None else mine + theirs)
+        return self
+
+    def result(self) -> dict:
+        """Final statistics. real/imag keys match the notebooks' normalization_stats."""
+        if self.count == 0:
+            raise ValueError("No data accumulated")
+        real_var = self.real_m2 / self.count
+        imag_var = self.imag_m2 / self.count
+        return {
+            "count": int(self.count),
+            "real_mean": float(self.real_mean),
+            "imag_mean": float(self.imag_mean),
+            "real_var": float(real_var),
+            "imag_var": float(imag_var),
+            "real_std": float(np.sqrt(real_var)),
+            "imag_std": float(np.sqrt(imag_var)),
+            "mean_power": float(self.power_sum / self.count),
+            "symbol_power": (self.symbol_power_sum * len(self.symbol_power_sum) / self.count).tolist(),
+            "subcarrier_power": (self.subcarrier_power_sum * len(self.subcarrier_power_sum) / self.count).tolist(),
+            "delay_power": (self.delay_power_sum * len(self.delay_power_sum) / self.count).tolist(),
+        }
+
+    def to_dict(self) -> dict:
+        state = {
+            "count": int(self.count),
+            "real_mean": float(self.real_mean),
+            "real_m2": float(self.real_m2),
+            "imag_mean": float(self.imag_mean),
+            "imag_m2": float(self.imag_m2),
+            "power_sum": float(self.power_sum),
+        }
+        for name in self._ARRAYS:
+            value = getattr(self, name)
+            state[name] = None if value is None else value.tolist()
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "ChannelStats":
+        stats = cls()
+        for name, value in state.items():
+            if name in cls._ARRAYS:
+                value = None if value is None else np.asarray(value, dtype=np.float64)
+            setattr(stats, name, value)
+        return stats
+
+
+def file_statistics(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE, decoder=None) -> ChannelStats:
+    """Accumulate one .npy file chunk by chunk through a read-only memmap.
+
+    decoder: maps stored blocks to channel matrices (see `src.tdl.storage_decoder`).
+    """
+    data = np.load(path, mmap_mode="r")
+    stats = ChannelStats()
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        stats.update(block if decoder is None else decoder(block))
+    return stats
+
+
+def _file_statistics_job(args: tuple) -> ChannelStats:
+    return file_statistics(*args)
+
+
+def folder_fingerprint(folder: Path, entries: list[dict]) -> str:
+    """Key of the files listed in a folder's metadata (SHA-256, or size and mtime)."""
+    files = {}
+    for entry in entries:
+        stat = os.stat(folder / entry["file"])
+        files[entry["file"]] = entry.get("sha256") or [stat.st_size, stat.st_mtime_ns]
+    return params_key(files)
+
+
+def folder_statistics(
+    folder: Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    use_cache: bool = True,
+) -> ChannelStats:
+    """Statistics over all files listed in folder/metadata.yaml, cached in folder/stats.yaml.
+
+    The cache is reused while the listed files are unchanged (by recorded SHA-256, or by
+    size and mtime for datasets built without a manifest).
+    """
+    folder = Path(folder)
+    metadata = load_config(folder / "metadata.yaml")
+    entries = metadata["generated"]
+    fingerprint = folder_fingerprint(folder, entries)
+    cache_path = folder / STATS_NAME
+    if use_cache and cache_path.exists():
+        cached = load_config(cache_path)
+        if cached.get("fingerprint") == fingerprint:
+            return ChannelStats.from_dict(cached["state"])
+
+    jobs = [(folder / entry["file"], chunk_size, storage_decoder(metadata, entry)) for entry in entries]
+    stats = ChannelStats()
+    if workers <= 1:
+        for part in map(_file_statistics_job, jobs):
+            stats.merge(part)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_file_statistics_job, jobs):
+                stats.merge(part)
+
+    if use_cache:
+        save_config(cache_path, {"fingerprint": fingerprint, "state": stats.to_dict()})
+    return stats
+
+
+def dataset_statistics(
+    root: Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    use_cache: bool = True,
+) -> dict:
+    """Statistics over a whole dataset (train layout or the 9-group test layout)."""
+    stats = ChannelStats()
+    for folder in dataset_folders(root):
+        stats.merge(folder_statistics(folder, chunk_size, workers, use_cache))
+    return stats.result()
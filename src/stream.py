@@ -0,0 +1,205 @@
+"""
+On-the-fly TDL channel generation for training, without writing .npy files.
+
+`TDLStream` splits a (profile, delay_spread, doppler_shift) grid into fixed-size
+blocks. Block i is always generated from the same seed (derived from the stream
+seed, the epoch and the block's grid point and position), so any block can be
+regenerated exactly with `TDLStream.block(i)` instead of being stored.
+
+With workers > 0, generator processes each take a disjoint slice of the blocks and
+write them into a ring of `queue_depth` slots in one shared-memory buffer. A worker
+waits for a free slot before generating, so the queue depth bounds both memory and
+how far generation runs ahead of the consumer. Iteration yields (channels, meta)
+where channels is a read-only view into shared memory (no copy). Its slot is
+refilled once the next block is requested, so copy it to keep the values. The
+mapping itself is only closed once the last view is gone, so a stale view reads
+newer data but never freed memory. A worker that dies without reporting (e.g.
+OOM-killed) raises RuntimeError in the consumer instead of blocking it forever.
+"""
+import multiprocessing
+import queue
+import traceback
+import weakref
+from itertools import product
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterator
+
+import numpy as np
+
+from src.manifest import derive_seed
+from src.tdl import generate_tdl_channels, output_layout, tdl_channel_shape
+
+POLL_INTERVAL = 1.0  # seconds between liveness checks of the workers while waiting for a block
+
+def grid_points(profiles, delay_spreads, doppler_shifts) -> list[tuple]:
+    """All (profile, delay_spread, doppler_shift) combinations, in a fixed order."""
+    return list(product(profiles, delay_spreads, doppler_shifts))
+
+
+class TDLStream:
+    def __init__(
+        self,
+        points: list[tuple],
+        channels_per_point: int,
+        *,
+        block_size: int = 256,
+        seed: int = 123,
+        epoch: int = 0,
+        workers: int = 2,
+        queue_depth: int = 4,
+        **generation_kwargs,
+    ):
+        """
+        points: (profile, delay_spread, doppler_shift) tuples, e.g. from `grid_points`.
+        channels_per_point: channels generated per point, in blocks of block_size.
+        seed, epoch: every block's seed is derived from (seed, epoch, point, block), so a
+            new epoch gives new channels and (seed, epoch, index) replays a block exactly.
+        workers: generator processes (0 generates in the consuming process).
+        queue_depth: shared-memory slots; at most this many blocks are ready or in flight.
+        generation_kwargs: forwarded to `generate_tdl_channels` (num_rbs, spacing,
+            antennas, backend, dtype, ...). Mean-power normalization applies per block.
+        """
+        for key in ("num_channels", "random_seed", "profile", "delay_spread", "doppler_shift"):
+            if key in generation_kwargs:
+                raise ValueError(f"{key!r} is set per block by TDLStream")
+        self.points = [tuple(point) for point in points]
+        self.channels_per_point = channels_per_point
+        self.block_size = block_size
+        self.seed = seed
+        self.epoch = epoch
+        self.workers = workers
+        self.queue_depth = max(queue_depth, workers, 1)
+        self.generation_kwargs = {"show_progress": False, **generation_kwargs}
+        self.blocks_per_point = -(-channels_per_point // block_size)
+
+    def __len__(self) -> int:
+        """Number of blocks per epoch."""
+        return len(self.points) * self.blocks_per_point
+
+    def block_info(self, index: int) -> dict:
+        """Grid point, seed and channel range of block index."""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        point_index, block = divmod(index, self.blocks_per_point)
+        profile, delay_spread, doppler_shift = self.points[point_index]
+        start = block * self.block_size
+        return {
+            "block": index,
+            "profile": profile,
+            "delay_spread": delay_spread,
+            "doppler_shift": doppler_shift,
+            "seed": derive_seed(self.seed, self.epoch, profile, delay_spread, doppler_shift, block),
+            "start": start,
+            "num_channels": min(self.block_size, self.channels_per_point - start),
+        }
+
+    def block(self, index: int) -> tuple[np.ndarray, dict]:
+        """Generate block index in this process (deterministic replay)."""
+        info = self.block_info(index)
+        channels = generate_tdl_channels(
+            info["num_channels"],
+            random_seed=info["seed"],
+            profile=info["profile"],
+            delay_spread=info["delay_spread"],
+            doppler_shift=info["doppler_shift"],
+            **self.generation_kwargs,
+        )
+        return channels, self._meta(info)
+
+    def _meta(self, info: dict) -> dict:
+        """Block info plus per-sample arrays (delay_spread, doppler_shift, index within the point)."""
+        n = info["num_channels"]
+        return {
+            **info,
+            "delay_spreads": np.full(n, info["delay_spread"]),
+            "doppler_shifts": np.full(n, info["doppler_shift"]),
+            "sample_index": info["start"] + np.arange(n),
+        }
+
+    def _slot_layout(self) -> tuple[tuple, np.dtype]:
+        kwargs = self.generation_kwargs
+        shape = (self.block_size,) + tdl_channel_shape(
+            kwargs.get("num_rbs", 10), kwargs.get("rx_antenna_count", 1), kwargs.get("tx_antenna_count", 1)
+        )
+        return output_layout(shape, kwargs.get("dtype", "complex128"))
+
+    def __iter__(self) -> Iterator[tuple[np.ndarray, dict]]:
+        """Yield (channels, meta) for every block of the epoch, in completion order."""
+        if self.workers <= 0:
+            for index in range(len(self)):
+                yield self.block(index)
+            return
+
+        slot_shape, dtype = self._slot_layout()
+        slot_bytes = int(np.prod(slot_shape)) * dtype.itemsize
+        shm = SharedMemory(create=True, size=slot_bytes * self.queue_depth)
+        slots = np.ndarray((self.queue_depth,) + slot_shape, dtype=dtype, buffer=shm.buf)
+        # Yielded blocks are views whose base is slots: unmap when the last of them is gone
+        weakref.finalize(slots, shm.close)
+        context = multiprocessing.get_context()
+        free, ready = context.Queue(), context.Queue()
+        for slot in range(self.queue_depth):
+            free.put(slot)
+        processes = [
+            context.Process(
+                target=_worker,
+                args=(self, worker, list(range(worker, len(self), self.workers)), shm.name, free, ready),
+                daemon=True,
+            )
+            for worker in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            finished, suspects = set(), set()
+            while len(finished) < len(processes):
+                try:
+                    message = ready.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    # A worker that exited without its end marker was killed (e.g. OOM). Only
+                    # give up on the second empty poll, so a marker still in the pipe arrives.
+                    dead = {w for w, p in enumerate(processes) if p.exitcode is not None} - finished
+                    if dead & suspects:
+                        worker = min(dead & suspects)
+                        raise RuntimeError(f"TDLStream worker {worker} exited with code "
+                                           f"{processes[worker].exitcode} without finishing its blocks")
+                    suspects = dead
+                    continue
+                if isinstance(message, int):  # end marker: the worker's number
+                    finished.add(message)
+                    continue
+                if isinstance(message, str):
+                    raise RuntimeError(f"TDLStream worker failed:\n{message}")
+                slot, index = message
+                info = self.block_info(index)
+                channels = slots[slot, :info["num_channels"]]
+                channels.flags.writeable = False
+                yield channels, self._meta(info)
+                free.put(slot)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            del slots  # closed by the finalizer once no yielded view is left
+            shm.unlink()
+
+
+def _worker(stream: TDLStream, worker: int, indices: list[int], shm_name: str, free, ready) -> None:
+    """Generator process: fill a free shared-memory slot per block and announce it, then
+    send its worker number as end marker (or its traceback on failure)."""
+    shm = SharedMemory(name=shm_name)
+    slot_shape, dtype = stream._slot_layout()
+    slots = np.ndarray((stream.queue_depth,) + slot_shape, dtype=dtype, buffer=shm.buf)
+    try:
+        for index in indices:
+            slot = free.get()           # blocks while the consumer is behind (backpressure)
+            channels, _ = stream.block(index)
+            slots[slot, :len(channels)] = channels
+            ready.put((slot, index))
+        ready.put(worker)
+    except Exception:
+        ready.put(traceback.format_exc())
+    finally:
+        del slots
+        shm.close()
@@ -0,0 +1,380 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable
+
+from src.config import worker_id
+from src.manifest import MANIFEST_NAME, file_sha256, is_current, load_manifest, params_key, save_manifest
+from src.profiling import Profiler, phase
+from src.tdl import backend_version, tap_storage_entry, tdl_cache_info, write_tdl_channels, write_tdl_doppler_sweep
+from src.workqueue import MERGE, QUEUE_DIR, WorkQueue
+from src.writer import BackgroundWriter
+
+# Optional config keys passed to write_tdl_channels only when set, so builds that do not use
+# them keep their manifest keys: the capture schedule (see src.tdl.capture_schedule), the
+# on-disk storage layout (see src.tdl.STORAGES) and the antenna correlation (see
+# src.tdl_native.spatial_correlation).
+OPTIONAL_KEYS = ("slots_per_channel", "slot_jitter", "storage", "mimo_correlation", "tx_direction")
+# Result fields needed to decode a file; kept in the manifest so skipped files keep them.
+DECODE_FIELDS = ("tap_delays_s", "scale")
+# Profiling fields of the run that built a file (see --profile); also kept in the manifest,
+# so a rerun that skips the file does not drop them from metadata.yaml.
+PROFILE_FIELDS = ("timings", "cache_misses")
+
+
+def job_key(kwargs: dict) -> str:
+    """Content key of one output file: its generation kwargs, backend version and dtype."""
+    params = {k: v for k, v in kwargs.items() if k != "show_progress"}
+    params["backend_version"] = backend_version(kwargs.get("backend", "neoradium"))
+    params.setdefault("dtype", "complex128")
+    return params_key(params)
+
+
+def generate_file(job: dict, profiler: Profiler | None = None) -> dict:
+    """Generate one (delay_spread, doppler_shift) pair straight into job["path"].
+
+    job: {"path": output .npy path, "kwargs": write_tdl_channels kwargs, "entry": metadata dict,
+    optionally "collect_timings": True}. If the entry names a "timestamps_file", the capture
+    time of every channel is saved there (next to path). For storage='taps' the result also
+    carries the file's tap delays and normalization scale (see `src.tdl.tap_storage_entry`).
+    The files are written under per-process temporary names and renamed into place once
+    complete, so an interrupted write never leaves a truncated file under the final name.
+    Returns job["entry"] plus the SHA-256 of the written file, and when profiling (a profiler
+    is passed in, or created for job["collect_timings"]) the per-phase "timings" and the
+    "cache_misses" of the Doppler-independent caches (see `src.tdl.tdl_cache_info`).
+    """
+    if profiler is None and job.get("collect_timings"):
+        profiler = Profiler()
+    cache_before = tdl_cache_info() if profiler is not None else None
+    path = Path(job["path"])
+    tmp = path.with_name(f".{path.name}.{worker_id()}.tmp")
+    times_name = job["entry"].get("timestamps_file")
+    times_tmp = path.with_name(f".{times_name}.{worker_id()}.tmp") if times_name else None
+    mean_power = write_tdl_channels(tmp, profiler=profiler, timestamps_path=times_tmp, **job["kwargs"])
+    with phase(profiler, "rename"):
+        if times_tmp is not None:
+            os.replace(times_tmp, path.with_name(times_name))
+        os.replace(tmp, path)
+    with phase(profiler, "checksum"):
+        result = {**job["entry"], "sha256": file_sha256(path)}
+    if job["kwargs"].get("storage") == "taps":
+        result.update(tap_storage_entry(mean_power, **job["kwargs"]))
+    if profiler is not None:
+        result.update(_profile_fields(profiler, cache_before))
+    return result
+
+
+def generate_doppler_group(group: dict, profiler: Profiler | None = None) -> list[dict]:
+    """Generate the files of several jobs that differ only in doppler_shift in one pass.
+
+    group: {"path": description for progress output, "jobs": jobs as for `generate_file`}.
+    The jobs share one fading draw (see `src.tdl.write_tdl_doppler_sweep`), so each file is
+    the one `generate_file` writes for its job. Returns one `generate_file` result per job;
+    with profiling, the timings and cache misses of the whole group go to the first one.
+    """
+    jobs = group["jobs"]
+    if profiler is None and jobs[0].get("collect_timings"):
+        profiler = Profiler()
+    cache_before = tdl_cache_info() if profiler is not None else None
+    kwargs = {key: value for key, value in jobs[0]["kwargs"].items() if key != "doppler_shift"}
+    paths = [Path(job["path"]) for job in jobs]
+    tmps = [path.with_name(f".{path.name}.{worker_id()}.tmp") for path in paths]
+    times_names = [job["entry"].get("timestamps_file") for job in jobs]
+    times_tmps = [path.with_name(f".{name}.{worker_id()}.tmp") if name else None
+                  for path, name in zip(paths, times_names)]
+    mean_powers = write_tdl_doppler_sweep(
+        tmps,
+        [job["kwargs"]["doppler_shift"] for job in jobs],
+        profiler=profiler,
+        timestamps_paths=times_tmps,
+        **kwargs,
+    )
+    results = []
+    for job, path, tmp, times_name, times_tmp, mean_power in zip(jobs, paths, tmps, times_names, times_tmps, mean_powers):
+        with phase(profiler, "rename"):
+            if times_tmp is not None:
+                os.replace(times_tmp, path.with_name(times_name))
+            os.replace(tmp, path)
+        with phase(profiler, "checksum"):
+            result = {**job["entry"], "sha256": file_sha256(path)}
+        if job["kwargs"].get("storage") == "taps":
+            result.update(tap_storage_entry(mean_power, **job["kwargs"]))
+        results.append(result)
+    if profiler is not None:
+        results[0].update(_profile_fields(profiler, cache_before))
+    return results
+
+
+def _profile_fields(profiler: Profiler, cache_before: dict) -> dict:
+    return {
+        "timings": profiler.to_dict(),
+        "cache_misses": {
+            name: info["misses"] - cache_before[name]["misses"] for name, info in tdl_cache_info().items()
+        },
+    }
+
+
+def submit_file(job: dict, writer: BackgroundWriter, profiler: Profiler | None = None) -> Future:
+    """Pipelined `generate_file`: generate job and hand its files to writer.
+
+    Returns as soon as the channels are generated (or a writer buffer frees up), with a
+    future of the same result dict as `generate_file`. The future resolves once the files
+    are on disk; its SHA-256 comes from the writer, so the file is never read back.
+    Timings cover generation only, not the background write.
+    """
+    if profiler is None and job.get("collect_timings"):
+        profiler = Profiler()
+    cache_before = tdl_cache_info() if profiler is not None else None
+    path = Path(job["path"])
+    times_name = job["entry"].get("timestamps_file")
+    times_path = path.with_name(times_name) if times_name else None
+    mean_power = write_tdl_channels(path, profiler=profiler, timestamps_path=times_path, writer=writer, **job["kwargs"])
+    times_written = writer.future(times_path) if times_path is not None else None
+    written = writer.future(path)  # written after the timestamps (submission order)
+
+    extra = {}
+    if job["kwargs"].get("storage") == "taps":
+        extra.update(tap_storage_entry(mean_power, **job["kwargs"]))
+    if profiler is not None:
+        extra.update(_profile_fields(profiler, cache_before))
+
+    done = Future()
+
+    def finish(future: Future) -> None:
+        error = future.exception() or (times_written.exception() if times_written is not None else None)
+        if error is not None:
+            done.set_exception(error)
+        else:
+            done.set_result({**job["entry"], "sha256": future.result(), **extra})
+
+    written.add_done_callback(finish)
+    return done
+
+
+def run_jobs(
+    fn: Callable[[dict], dict],
+    jobs: list[dict],
+    workers: int = 1,
+    on_result: Callable[[int, dict], None] | None = None,
+    write_buffers: int = 0,
+) -> list[dict]:
+    """Run fn over jobs, serially (workers <= 1) or in a process pool.
+
+    on_result(i, result) is called in the main process as each job finishes.
+    Results are returned in the order of jobs regardless of completion order.
+
+    write_buffers > 0 (serial only) pipelines generation with disk writes: fn is then called
+    as fn(job, writer) and must return a future of the result (see `submit_file`), with a
+    `BackgroundWriter` holding at most write_buffers arrays or chunks in flight.
+    """
+    results = [None] * len(jobs)
+    if write_buffers > 0:
+        if workers > 1:
+            raise ValueError("write_buffers requires workers <= 1 (pool workers already overlap each other's I/O)")
+        in_flight = deque()
+
+        def finish() -> None:
+            i, future = in_flight.popleft()
+            results[i] = future.result()
+            if on_result is not None:
+                on_result(i, results[i])
+
+        with BackgroundWriter(write_buffers) as writer:
+            for i, job in enumerate(jobs):
+                print(f"  [{i + 1}/{len(jobs)}] {job['path']}")
+                in_flight.append((i, fn(job, writer)))
+                while in_flight and in_flight[0][1].done():
+                    finish()
+            while in_flight:
+                finish()
+        return results
+
+    if workers <= 1:
+        for i, job in enumerate(jobs):
+            print(f"  [{i + 1}/{len(jobs)}] {job['path']}")
+            results[i] = fn(job)
+            if on_result is not None:
+                on_result(i, results[i])
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, job): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            results[i] = future.result()
+            print(f"  [{done}/{len(jobs)}] {jobs[i]['path']}")
+            if on_result is not None:
+                on_result(i, results[i])
+    return results
+
+
+def _stored_result(job: dict, rel_path: str, key: str, files: dict, output_dir: Path) -> dict | None:
+    """Result of a job whose file (and timestamps sidecar) is current in the manifest, else None."""
+    times_name = job["entry"].get("timestamps_file")
+    if times_name is not None and not Path(job["path"]).with_name(times_name).exists():
+        return None
+    if not is_current(output_dir, rel_path, key, files):
+        return None
+    stored = files[rel_path]
+    return {**job["entry"], **stored.get("decode", {}), **stored.get("profile", {}), "sha256": stored["sha256"]}
+
+
+def _manifest_record(key: str, result: dict) -> dict:
+    record = {"key": key, "sha256": result["sha256"]}
+    decode = {field: result[field] for field in DECODE_FIELDS if field in result}
+    if decode:
+        record["decode"] = decode
+    profile = {field: result[field] for field in PROFILE_FIELDS if field in result}
+    if profile:
+        record["profile"] = profile
+    return record
+
+
+def run_build(
+    fn: Callable[[dict], dict],
+    jobs: list[dict],
+    output_dir: Path,
+    workers: int = 1,
+    write_buffers: int = 0,
+    group_by: Callable[[dict], object] | None = None,
+) -> list[dict]:
+    """Run jobs resumably against output_dir/manifest.yaml.
+
+    Jobs whose file is present, built from the same job_key and checksum-valid are skipped;
+    the rest go through run_jobs (with write_buffers, see there), and the manifest is saved
+    as each one finishes so an interrupted build resumes where it stopped. Returns one
+    result per job, in job order (for skipped files: the job entry plus the checksum and
+    decode fields from the manifest).
+
+    group_by: optional job -> key. Pending jobs with equal keys run as one unit:
+    fn({"path": ..., "jobs": [...]}) returns their results as a list (see
+    `generate_doppler_group`). Units, not jobs, are spread over the workers.
+    """
+    output_dir = Path(output_dir)
+    files = load_manifest(output_dir)
+    keys = [job_key(job["kwargs"]) for job in jobs]
+    rel_paths = [Path(job["path"]).relative_to(output_dir).as_posix() for job in jobs]
+
+    results = [None] * len(jobs)
+    pending = []
+    for i, job in enumerate(jobs):
+        results[i] = _stored_result(job, rel_paths[i], keys[i], files, output_dir)
+        if results[i] is None:
+            pending.append(i)
+    if len(pending) < len(jobs):
+        print(f"Skipping {len(jobs) - len(pending)} up-to-date file(s), generating {len(pending)}")
+
+    units = [[i] for i in pending]
+    unit_jobs = [jobs[i] for i in pending]
+    if group_by is not None:
+        grouped = {}
+        for i in pending:
+            grouped.setdefault(group_by(jobs[i]), []).append(i)
+        units = list(grouped.values())
+        unit_jobs = [
+            {"path": f"{jobs[unit[0]]['path']} (+{len(unit) - 1} more)", "jobs": [jobs[i] for i in unit]}
+            for unit in units
+        ]
+
+    def record(j: int, result) -> None:
+        for i, item in zip(units[j], result if group_by is not None else [result]):
+            results[i] = item
+            files[rel_paths[i]] = _manifest_record(keys[i], item)
+        save_manifest(output_dir, files)
+
+    run_jobs(fn, unit_jobs, workers, on_result=record, write_buffers=write_buffers)
+    return results
+
+
+def _work_queue(queue: WorkQueue, fn: Callable[[dict], dict], jobs: list[dict], poll_interval: float) -> None:
+    """Claim and run queue items until all are done, waiting on items other workers hold."""
+    while pending := queue.pending():
+        claimed = False
+        for i in pending:
+            if not queue.claim(i):
+                continue
+            claimed = True
+            try:
+                with queue.lease(i):
+                    result = fn(jobs[i])
+                queue.complete(i, result)
+            finally:
+                queue.release(i)
+            print(f"  [{worker_id()}] {jobs[i]['path']}")
+        if not claimed:
+            time.sleep(poll_interval)
+
+
+def run_queue(
+    fn: Callable[[dict], dict],
+    jobs: list[dict],
+    output_dir: Path,
+    workers: int = 1,
+    lease_timeout: float = 600.0,
+    poll_interval: float = 5.0,
+    finish: Callable[[list[dict]], None] | None = None,
+    outputs: tuple = (),
+) -> list[dict] | None:
+    """Run jobs through the shared-filesystem work queue in output_dir/.queue (see src.workqueue).
+
+    Any number of processes, on any nodes that share output_dir, may call this with the same
+    jobs; each runs `workers` local processes that claim items until none are left, waiting on
+    items held by live workers and reclaiming those whose lease (lease_timeout seconds without
+    a heartbeat) expired. Files already current in manifest.yaml are marked done without being
+    regenerated. Every call also re-checks the files of done items against the checksums in
+    their results and requeues those that are missing or corrupt.
+
+    Once every item is done, one caller at a time takes the merge: it writes manifest.yaml,
+    calls finish(results) (e.g. to write metadata.yaml) and only then marks the queue merged,
+    returning the results in job order. The other callers wait for the merge and get None.
+    A merger that dies is replaced after lease_timeout, and a later run merges again if
+    manifest.yaml or any of outputs (the files finish writes) is missing.
+    """
+    output_dir = Path(output_dir)
+    keys = [job_key(job["kwargs"]) for job in jobs]
+    rel_paths = [Path(job["path"]).relative_to(output_dir).as_posix() for job in jobs]
+    queue = WorkQueue(output_dir / QUEUE_DIR, keys, lease_timeout)
+    if queue.merged() and not all(Path(path).exists() for path in (output_dir / MANIFEST_NAME, *outputs)):
+        queue.unmerge()
+
+    files = load_manifest(output_dir)
+    for i in range(len(jobs)):
+        # A done item whose file (or sidecar) was since deleted or corrupted runs again.
+        result = queue.result(i)
+        if result is not None and _stored_result(
+            jobs[i], rel_paths[i], keys[i], {rel_paths[i]: _manifest_record(keys[i], result)}, output_dir
+        ) is None:
+            print(f"  {rel_paths[i]} is missing or does not match its checksum; requeued")
+            queue.requeue(i)
+    for i in queue.pending():
+        stored = _stored_result(jobs[i], rel_paths[i], keys[i], files, output_dir)
+        if stored is not None:
+            queue.complete(i, stored)
+    print(f"Queue {queue.root}: {len(queue.pending())} of {len(jobs)} item(s) pending")
+
+    while not queue.merged():
+        if not queue.pending():
+            if queue.claim_merge():
+                try:
+                    with queue.lease(MERGE):
+                        results = [queue.result(i) for i in range(len(jobs))]
+                        for i, result in enumerate(results):
+                            files[rel_paths[i]] = _manifest_record(keys[i], result)
+                        save_manifest(output_dir, files)
+                        if finish is not None:
+                            finish(results)
+                    queue.finish_merge()
+                finally:
+                    queue.release(MERGE)
+                return results
+            time.sleep(poll_interval)  # another caller is merging (or its lease runs out)
+        elif workers <= 1:
+            _work_queue(queue, fn, jobs, poll_interval)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_work_queue, queue, fn, jobs, poll_interval) for _ in range(workers)]
+                for future in futures:
+                    future.result()
+    return None
@@ -1,6 +1,407 @@
-from NeoRadium.neoradium import TdlChannel, random, Carrier
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
 import numpy as np
-from tqdm import tqdm
+
+from src.profiling import Profiler, phase
+from src.tdl_native import (
+    ENGINE_VERSION,
+    SAMPLE_RATE,
+    SYMBOLS_PER_SLOT,
+    iter_native_tdl_channels,
+    slot_start_samples,
+    spatial_correlation,
+    subcarrier_frequencies,
+    subcarrier_kernel,
+    tap_terms,
+)
+
+# NeoRadium and tqdm are imported where first used: workers on the numpy backend and
+# processes that only read datasets never pay for them.
+if TYPE_CHECKING:
+    from NeoRadium.neoradium import TdlChannel
+
+    from src.writer import BackgroundWriter
+
+DEFAULT_CHUNK_SIZE = 256
+# Upper bound on one block of complex128 channel matrices. A 1x1 channel on 10 RBs is 27 KB,
+# so this only shrinks blocks of multi-antenna configs (to 19 channels for 32x4).
+DEFAULT_MAX_BLOCK_BYTES = 1 << 26
+BACKENDS = ("neoradium", "numpy")
+# Output precisions. 'float16' stores interleaved (real, imag) pairs in a trailing axis of size 2.
+DTYPES = ("complex128", "complex64", "float16")
+# On-disk layouts. 'dense' stores (N, L, K, Nr, Nt) channel matrices; 'taps' (numpy backend
+# only) stores the raw per-tap gains (N, L, Nr, Nt, P), decoded with `decode_taps`.
+STORAGES = ("dense", "taps")
+
+
+def backend_version(backend: str = "neoradium") -> str:
+    """Version string identifying the code that produces channels for a backend."""
+    if backend == "numpy":
+        return f"numpy-engine-{ENGINE_VERSION}"
+    from NeoRadium import neoradium
+
+    return f"neoradium-{getattr(neoradium, '__version__', 'unknown')}"
+
+
+@lru_cache(maxsize=16)
+def _bandwidth_part(start_rb: int, num_rbs: int, spacing: int):
+    """NeoRadium bandwidth part for a carrier; shared by all channels with the same numerology."""
+    from NeoRadium.neoradium import Carrier
+
+    return Carrier(startRb=start_rb, numRbs=num_rbs, spacing=spacing).curBwp
+
+
+def tdl_cache_info() -> dict:
+    """Hit/miss counters of the per-process caches of Doppler-independent quantities.
+
+    'taps': tap tables and subcarrier kernels of the numpy backend (`tdl_native.tap_terms`),
+    'spatial_correlation': its antenna correlation roots, 'bandwidth_part': NeoRadium
+    carriers. In a process pool each worker has its own caches.
+    """
+    return {
+        name: cached.cache_info()._asdict()
+        for name, cached in (
+            ("taps", tap_terms), ("spatial_correlation", spatial_correlation), ("bandwidth_part", _bandwidth_part)
+        )
+    }
+
+
+def clear_tdl_caches() -> None:
+    tap_terms.cache_clear()
+    spatial_correlation.cache_clear()
+    _bandwidth_part.cache_clear()
+
+
+def tdl_channel_shape(num_rbs: int = 10, rx_antenna_count: int = 1, tx_antenna_count: int = 1) -> tuple:
+    """Shape (L, K, Nr, Nt) of a single channel matrix returned by `getChannelMatrix()`."""
+    return (SYMBOLS_PER_SLOT, 12 * num_rbs, rx_antenna_count, tx_antenna_count)
+
+
+def block_channels(
+    chunk_size: int,
+    num_rbs: int = 10,
+    rx_antenna_count: int = 1,
+    tx_antenna_count: int = 1,
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES,
+) -> int:
+    """chunk_size capped so a block of complex128 channel matrices fits in max_block_bytes.
+
+    Channel matrices grow with Nr * Nt, so e.g. 32x4 blocks hold 128 times fewer channels
+    than 1x1 blocks of the same size. At least one channel per block.
+    """
+    channel_bytes = 16 * int(np.prod(tdl_channel_shape(num_rbs, rx_antenna_count, tx_antenna_count)))
+    return max(1, min(chunk_size, max_block_bytes // channel_bytes))
+
+
+def capture_schedule(
+    num_channels: int,
+    *,
+    slots_per_channel: int = 1,
+    slot_jitter: int = 0,
+    random_seed: int = 123,
+    capture_slots=None,
+) -> np.ndarray:
+    """Slot index of every captured channel matrix, shape (num_channels,), int64.
+
+    capture_slots: explicit slot indices (one per channel), returned as is.
+    Otherwise capture i is at slot i * slots_per_channel, plus, if slot_jitter > 0, a
+    uniform random offset in [0, slot_jitter] drawn from its own generator seeded by
+    random_seed (so the fading draws are the same with or without jitter).
+    """
+    if capture_slots is not None:
+        slots = np.asarray(capture_slots, dtype=np.int64)
+        if slots.shape != (num_channels,):
+            raise ValueError(f"capture_slots must have shape ({num_channels},), got {slots.shape}")
+        if np.any(slots < 0):
+            raise ValueError("capture_slots must be non-negative")
+        return slots
+    slots = np.arange(num_channels, dtype=np.int64) * slots_per_channel
+    if slot_jitter > 0:
+        slots += np.random.default_rng([random_seed, 1]).integers(0, slot_jitter + 1, num_channels)
+    return slots
+
+
+def capture_times(slots: np.ndarray, spacing: int = 15) -> np.ndarray:
+    """Start time in seconds of each captured slot (slot 0 starts at t = 0)."""
+    return slot_start_samples(slots, spacing) / SAMPLE_RATE
+
+
+def _seek_slot(channel: "TdlChannel", slot: int, spacing: int) -> None:
+    """Move a NeoRadium channel to the start of an arbitrary slot in O(1).
+
+    The SoS fading is an analytic function of time, so instead of calling goNext() once
+    per slot we set the slot start (in samples) and the bandwidth part's slot number
+    (which selects the CP lengths) directly; getChannelMatrix() then evaluates that slot.
+    """
+    start = int(slot_start_samples(slot, spacing))
+    if channel.curSlotStart == start and channel.nextSlotStart > start:
+        return  # this slot is already prepared (e.g. slot 0 right after construction)
+    channel.curSlotStart = channel.nextSlotStart = start
+    channel.bwp.slotNo = int(slot)
+
+
+def iter_tdl_channels(
+    num_channels: int = 10000,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    random_seed: int = 123,
+    start_rb: int = 0,
+    num_rbs: int = 10,
+    spacing: int = 15,
+    tx_antenna_count: int = 1,
+    rx_antenna_count: int = 1,
+    carrier_freq: float = 3.5e9,
+    doppler_shift: float = 100,
+    delay_spread: int = 500,
+    profile: str = "A",
+    show_progress: bool = True,
+    slots_per_channel: int = 1,
+    sos_type: str = "Xiao",
+    sos_num_sins: int = 32,
+    backend: str = "neoradium",
+    profiler: Profiler | None = None,
+    capture_slots=None,
+    slot_jitter: int = 0,
+    storage: str = "dense",
+    mimo_correlation: str = "Low",
+    tx_direction: str = "Downlink",
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES,
+    **channel_kwargs,
+) -> Iterator[np.ndarray]:
+    """Yield raw (unnormalized) TDL channel matrices in blocks of at most chunk_size.
+
+    Produces the same sequence as `generate_tdl_channels(..., normalize_mean_power=False)`
+    but only holds one (chunk_size, L, K, Nr, Nt) block in memory at a time; chunk_size is
+    reduced for large antenna counts so a block stays within max_block_bytes
+    (see `block_channels`).
+    With storage='taps' (backend='numpy' only) the blocks are the per-tap gains
+    (chunk_size, L, Nr, Nt, P) instead; see `decode_taps`.
+    See `generate_tdl_channels` for the meaning of the other arguments.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if storage not in STORAGES:
+        raise ValueError(f"Unknown storage {storage!r}; expected one of {STORAGES}")
+    if storage == "taps" and backend != "numpy":
+        raise ValueError("storage='taps' requires backend='numpy' (NeoRadium channels are not "
+                         "a fixed set of tap delays)")
+    chunk_size = block_channels(chunk_size, num_rbs, rx_antenna_count, tx_antenna_count, max_block_bytes)
+    slots = capture_schedule(
+        num_channels,
+        slots_per_channel=slots_per_channel,
+        slot_jitter=slot_jitter,
+        random_seed=random_seed,
+        capture_slots=capture_slots,
+    )
+    if backend == "numpy":
+        blocks = iter_native_tdl_channels(
+            num_channels,
+            chunk_size=chunk_size,
+            random_seed=random_seed,
+            start_rb=start_rb,
+            num_rbs=num_rbs,
+            spacing=spacing,
+            tx_antenna_count=tx_antenna_count,
+            rx_antenna_count=rx_antenna_count,
+            carrier_freq=carrier_freq,
+            doppler_shift=doppler_shift,
+            delay_spread=delay_spread,
+            profile=profile,
+            show_progress=show_progress,
+            slots_per_channel=slots_per_channel,
+            sos_type=sos_type,
+            sos_num_sins=sos_num_sins,
+            capture_slots=slots,
+            storage=storage,
+            mimo_correlation=mimo_correlation,
+            tx_direction=tx_direction,
+            **channel_kwargs,
+        )
+        while True:
+            with phase(profiler, "native_block"):
+                block = next(blocks, None)
+            if block is None:
+                return
+            yield block
+
+    from NeoRadium.neoradium import TdlChannel, random
+
+    with phase(profiler, "channel_setup"):
+        random.setSeed(random_seed)
+        bwp = _bandwidth_part(start_rb, num_rbs, spacing)
+        channel = TdlChannel(
+            bwp,
+            profile,
+            carrierFreq=carrier_freq,
+            dopplerShift=doppler_shift,
+            delaySpread=delay_spread,
+            txAntennaCount=tx_antenna_count,
+            rxAntennaCount=rx_antenna_count,
+            seed=random_seed,
+            sosType=sos_type,
+            sosNumSins=sos_num_sins,
+            mimoCorrelation=mimo_correlation,
+            txDir=tx_direction,
+            **channel_kwargs,
+        )
+
+    shape = tdl_channel_shape(num_rbs, rx_antenna_count, tx_antenna_count)
+    progress = None
+    if show_progress:
+        from tqdm import tqdm
+
+        progress = tqdm(total=num_channels, desc="TDL channels")
+    try:
+        for start in range(0, num_channels, chunk_size):
+            block = np.empty((min(chunk_size, num_channels - start),) + shape, dtype=np.complex128)
+            for i in range(len(block)):
+                with phase(profiler, "seek"):
+                    _seek_slot(channel, slots[start + i], spacing)
+                with phase(profiler, "get_channel_matrix"):
+                    matrix = channel.getChannelMatrix()
+                with phase(profiler, "copy"):
+                    block[i] = matrix
+            if progress is not None:
+                progress.update(len(block))
+            yield block
+    finally:
+        if progress is not None:
+            progress.close()
+
+
+def output_layout(shape: tuple, dtype: str = "complex128") -> tuple[tuple, np.dtype]:
+    """On-disk (shape, numpy dtype) of complex channels of the given shape stored as dtype."""
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype {dtype!r}; expected one of {DTYPES}")
+    if dtype == "float16":
+        return tuple(shape) + (2,), np.dtype(np.float16)
+    return tuple(shape), np.dtype(dtype)
+
+
+def cast_channels(block: np.ndarray, dtype: str = "complex128") -> np.ndarray:
+    """Convert complex channels to the storage dtype (see DTYPES)."""
+    if dtype == "float16":
+        return block.view(block.real.dtype).reshape(block.shape + (2,)).astype(np.float16)
+    return block.astype(dtype, copy=False)
+
+
+def to_complex(block: np.ndarray) -> np.ndarray:
+    """Inverse of cast_channels for reading: float16 pairs become complex64, complex is unchanged."""
+    if np.iscomplexobj(block):
+        return block
+    pairs = block.astype(np.float32)
+    return pairs[..., 0] + 1j * pairs[..., 1]
+
+
+@lru_cache(maxsize=64)
+def _cached_kernel(delays: tuple, freqs: tuple) -> np.ndarray:
+    kernel = subcarrier_kernel(np.array(delays), np.array(freqs))
+    kernel.flags.writeable = False
+    return kernel
+
+
+def tap_kernel(delays, freqs) -> np.ndarray:
+    """Cached read-only subcarrier kernel exp(-j2π f τ) (P, K) for stored tap delays and frequencies."""
+    return _cached_kernel(tuple(float(d) for d in delays), tuple(float(f) for f in freqs))
+
+
+def decode_taps(gains: np.ndarray, kernel: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """Rebuild channel matrices (..., L, K, Nr, Nt) from stored tap gains (..., L, Nr, Nt, P).
+
+    One matrix product against the kernel, then division by the normalization scale
+    recorded at write time. For complex128 storage this reproduces the dense file exactly;
+    complex64 and float16 storage decode to complex64.
+    """
+    gains = to_complex(gains)
+    kernel = kernel.astype(np.result_type(gains.dtype, np.complex64), copy=False)
+    h = np.ascontiguousarray(np.moveaxis(gains @ kernel, -1, -3))
+    if scale != 1.0:
+        h /= scale
+    return h
+
+
+def storage_decoder(metadata: dict, entry: dict):
+    """Decoder for one file listed in a metadata.yaml: None for dense files, else a function
+    mapping stored blocks to channel matrices."""
+    if metadata.get("storage", "dense") == "dense":
+        return None
+    kernel = tap_kernel(entry["tap_delays_s"], metadata["subcarrier_frequencies_hz"])
+    return partial(decode_taps, kernel=kernel, scale=entry["scale"])
+
+
+def storage_metadata(storage: str = "dense", num_rbs: int = 10, spacing: int = 15) -> dict:
+    """Dataset-level metadata.yaml fields describing the storage layout (see STORAGES)."""
+    if storage not in STORAGES:
+        raise ValueError(f"Unknown storage {storage!r}; expected one of {STORAGES}")
+    if storage == "dense":
+        return {"storage": storage}
+    return {"storage": storage, "subcarrier_frequencies_hz": subcarrier_frequencies(num_rbs, spacing).tolist()}
+
+
+def tap_storage_entry(mean_power: float, normalize_mean_power: bool = True, **kwargs) -> dict:
+    """metadata.yaml fields of a storage='taps' file: its tap delays and normalization scale.
+
+    kwargs are the `write_tdl_channels` arguments of the file; mean_power its return value.
+    """
+    terms = tap_terms(
+        kwargs.get("profile", "A"),
+        kwargs.get("delay_spread", 500),
+        kwargs.get("spacing", 15),
+        kwargs.get("num_rbs", 10),
+        kwargs.get("rx_antenna_count", 1),
+        kwargs.get("tx_antenna_count", 1),
+    )
+    scale = np.sqrt(mean_power) if normalize_mean_power and mean_power > 0 else 1.0
+    return {"tap_delays_s": terms.delays.tolist(), "scale": float(scale)}
+
+
+def _fill(
+    out: np.ndarray,
+    blocks: Iterator[np.ndarray],
+    dtype: str = "complex128",
+    profiler: Profiler | None = None,
+    kernel: np.ndarray | None = None,
+) -> float:
+    """Copy blocks into out along axis 0 (cast to dtype) and return the sum of |H|^2.
+
+    The power is accumulated from the complex128 blocks, before any downcast. If the blocks
+    are tap gains, pass their kernel so the power is that of the channel matrices. If out
+    is a `src.writer.ChunkStream` and generation fails, the stream is aborted, so its
+    partial file is closed and removed right away rather than when the writer exits.
+    """
+    offset = 0
+    power_sum = 0.0
+    try:
+        for block in blocks:
+            with phase(profiler, "store"):
+                power_sum += _store(out, offset, block, dtype, kernel)
+            offset += len(block)
+    except BaseException as error:
+        if hasattr(out, "abort"):  # a ChunkStream; arrays and memmaps need no cleanup here
+            out.abort(error)
+        raise
+    return power_sum
+
+
+def _store(out: np.ndarray, offset: int, block: np.ndarray, dtype: str, kernel: np.ndarray | None) -> float:
+    """Write one block into out at offset (cast to dtype) and return its sum of |H|^2."""
+    out[offset:offset + len(block)] = cast_channels(block, dtype)
+    h = block if kernel is None else np.ascontiguousarray(np.moveaxis(block @ kernel, -1, -3))
+    return np.vdot(h, h).real
+
+
+def _scale_in_place(out: np.ndarray, scale: float, chunk_size: int) -> None:
+    """Divide out by scale one chunk at a time (no full-size temporaries)."""
+    for start in range(0, len(out), chunk_size):
+        out[start:start + chunk_size] /= scale
+
+
+def _scale_into(out: np.ndarray, raw: np.ndarray, scale: float, dtype: str, chunk_size: int) -> None:
+    """Write raw / scale into out chunk by chunk, normalizing in complex128 before the downcast."""
+    for start in range(0, len(raw), chunk_size):
+        out[start:start + chunk_size] = cast_channels(raw[start:start + chunk_size] / scale, dtype)
 
 
 def generate_tdl_channels(
@@ -21,60 +422,348 @@ def generate_tdl_channels(
     slots_per_channel: int = 1,
     sos_type: str = "Xiao",
     sos_num_sins: int = 32,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    backend: str = "neoradium",
+    dtype: str = "complex128",
+    profiler: Profiler | None = None,
+    capture_slots=None,
+    slot_jitter: int = 0,
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES,
     **channel_kwargs,
 ) -> np.ndarray:
     """Generate TDL channel matrices over multiple slots.
 
-    NeoRadium advances time by one **slot** per `goNext()`. Slot duration is determined
-    by **spacing** (subcarrier spacing): 15 kHz → 1 slot = 1 ms; 30 kHz → 0.5 ms; etc.
+    Each channel matrix is one **slot**. Slot duration is determined by **spacing**
+    (subcarrier spacing): 15 kHz → 1 slot = 1 ms; 30 kHz → 0.5 ms; etc.
     For low Doppler, use spacing=15 and optionally slots_per_channel > 1 so consecutive
     channel matrices are further apart in time (less variation).
 
     Within-slot correlation (across OFDM symbols): NeoRadium uses a Sum-of-Sinusoids (SOS)
-    method for Doppler. Use sos_type='GMEDS1' (default) for smooth, deterministic
-    evolution; avoid 'Xiao' which can give less smooth transitions. Increasing
-    sos_num_sins (default 64) improves correlation at short lags (consecutive symbols).
+    method for Doppler. The default sos_type='Xiao' redraws its sinusoids every slot; use
+    'GMEDS1' for smooth, deterministic evolution across slots. Increasing sos_num_sins
+    (default 32) improves correlation at short lags (consecutive symbols).
 
     slots_per_channel: advance this many slots between each captured channel matrix
         (default 1). E.g. slots_per_channel=5 with spacing=15 gives one channel every 5 ms.
+        The channel is evaluated directly at each captured slot, so the cost per channel
+        does not grow with slots_per_channel.
+    slot_jitter: add a uniform random offset in [0, slot_jitter] slots to each capture.
+    capture_slots: explicit slot index per channel (overrides the two options above).
+        See `capture_schedule`; `capture_times(capture_schedule(...), spacing)` gives the
+        per-channel timestamps.
 
     sos_type: passed to NeoRadium as sosType ('GMEDS1' or 'Xiao').
-    sos_num_sins: passed to NeoRadium as sosNumSins (number of sinusoids; default 64 for
-        better within-slot correlation than NeoRadium's default 32).
+    sos_num_sins: passed to NeoRadium as sosNumSins (number of sinusoids; default 32,
+        NeoRadium's default; e.g. 64 gives better within-slot correlation).
+
+    chunk_size: number of channel matrices generated per block (see `iter_tdl_channels`).
+        The output is preallocated and filled block by block; normalization is done in place.
+    max_block_bytes: cap on one block of complex128 channel matrices; lowers chunk_size
+        for large Nr * Nt (see `block_channels`). The returned array itself is still
+        num_channels channels: use `write_tdl_channels` for memory bounded by one block.
+
+    mimo_correlation: spatial correlation of the antennas, 'Low' (default, uncorrelated),
+        'Medium', 'MediumA' (downlink) or 'High', with tx_direction 'Downlink' (default)
+        or 'Uplink' (TS 38.101-4 / TS 38.104 co-polarized arrays; passed to NeoRadium as
+        mimoCorrelation and txDir, see `src.tdl_native.spatial_correlation`).
+
+    backend: 'neoradium' (default) steps NeoRadium's TdlChannel one slot at a time;
+        'numpy' uses the vectorized engine in `src.tdl_native`, which computes whole blocks
+        of slots at once with the same (N, L, K, Nr, Nt) layout and TDL statistics
+        (see that module for the differences).
+
+    dtype: output precision, one of 'complex128' (default), 'complex64' or 'float16'
+        (interleaved real/imag pairs in a trailing axis of size 2). Channels are generated
+        and normalized in complex128 and only downcast at the end.
+
+    profiler: optional `src.profiling.Profiler` collecting per-phase wall time, call
+        counts and peak RSS per phase (channel_setup, seek, get_channel_matrix or
+        native_block, copy, cast, store, normalize). None (default) disables the hooks.
 
     With NeoRadium defaults, mean power E[|H|^2] is typically ~1–2 depending on profile
     (path powers are normalized; combined channel power varies with number of paths and tap overlap).
 
-    Returns an array of shape (num_channels, L, K, Nr, Nt) of complex channel matrices.
+    Returns an array of shape (num_channels, L, K, Nr, Nt) of complex channel matrices
+    ((num_channels, L, K, Nr, Nt, 2) for dtype='float16').
     """
-    random.setSeed(random_seed)
-    carrier = Carrier(startRb=start_rb, numRbs=num_rbs, spacing=spacing)
-    bwp = carrier.curBwp
-    channel = TdlChannel(
-        bwp,
-        profile,
-        carrierFreq=carrier_freq,
-        dopplerShift=doppler_shift,
-        delaySpread=delay_spread,
-        txAntennaCount=tx_antenna_count,
-        rxAntennaCount=rx_antenna_count,
-        seed=random_seed,
-        sosType=sos_type,
-        sosNumSins=sos_num_sins,
+    output_layout((), dtype)
+    chunk_size = block_channels(chunk_size, num_rbs, rx_antenna_count, tx_antenna_count, max_block_bytes)
+    out = np.empty(
+        (num_channels,) + tdl_channel_shape(num_rbs, rx_antenna_count, tx_antenna_count),
+        dtype=np.complex128,
+    )
+    power_sum = _fill(out, iter_tdl_channels(
+        num_channels,
+        chunk_size=chunk_size,
+        random_seed=random_seed,
+        start_rb=start_rb,
+        num_rbs=num_rbs,
+        spacing=spacing,
+        tx_antenna_count=tx_antenna_count,
+        rx_antenna_count=rx_antenna_count,
+        carrier_freq=carrier_freq,
+        doppler_shift=doppler_shift,
+        delay_spread=delay_spread,
+        profile=profile,
+        show_progress=show_progress,
+        slots_per_channel=slots_per_channel,
+        sos_type=sos_type,
+        sos_num_sins=sos_num_sins,
+        backend=backend,
+        profiler=profiler,
+        capture_slots=capture_slots,
+        slot_jitter=slot_jitter,
+        max_block_bytes=max_block_bytes,
         **channel_kwargs,
+    ), profiler=profiler)
+    if normalize_mean_power and out.size:
+        scale = np.sqrt(power_sum / out.size)
+        if scale > 0:
+            with phase(profiler, "normalize"):
+                _scale_in_place(out, scale, chunk_size)
+    with phase(profiler, "cast"):
+        return cast_channels(out, dtype)
+
+
+def write_tdl_channels(
+    path: Path,
+    num_channels: int = 10000,
+    *,
+    num_rbs: int = 10,
+    tx_antenna_count: int = 1,
+    rx_antenna_count: int = 1,
+    normalize_mean_power: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dtype: str = "complex128",
+    profiler: Profiler | None = None,
+    timestamps_path: Path | None = None,
+    storage: str = "dense",
+    writer: "BackgroundWriter | None" = None,
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES,
+    **kwargs,
+) -> float:
+    """Generate TDL channels straight into a .npy file with bounded memory.
+
+    The file is preallocated with `np.lib.format.open_memmap` and filled one chunk at a
+    time from `iter_tdl_channels`, so peak memory is one chunk regardless of num_channels.
+    Chunks are capped at max_block_bytes of channel matrices (see `block_channels`), so
+    this also holds for large antenna counts.
+    Mean-power normalization uses the power accumulated while writing, followed by a
+    second in-place pass over the memmap. The file content matches `np.save` of
+    `generate_tdl_channels` with the same arguments.
+
+    For dtype other than complex128 with normalization, the raw complex128 channels are
+    staged in a temporary memmap next to path so the scale is applied before the downcast;
+    the staging file is removed afterwards.
+
+    profiler: optional `src.profiling.Profiler`; adds the memmap flush as phase 'save'.
+    timestamps_path: if given, the capture time (s) of every channel is saved there as a
+        (num_channels,) float64 .npy (see `capture_times`).
+    storage: 'taps' (backend='numpy' only) stores the raw per-tap gains (N, L, Nr, Nt, P)
+        instead of the channel matrices, typically 5x or more smaller. Nothing is rescaled
+        on disk: record `tap_storage_entry(mean_power, ...)` (tap delays and normalization
+        scale) with the file and decode it with `decode_taps`.
+    writer: optional `src.writer.BackgroundWriter`. The file and timestamps are handed to
+        it instead of being written here, so this returns as soon as the channels are
+        generated. If nothing is rescaled afterwards (storage='taps' or no normalization),
+        chunks stream to the writer as they are generated. Otherwise the file is built in
+        memory and submitted whole. Time spent waiting for a free writer buffer shows up
+        in phase 'store' (streamed chunks) or 'save' (whole files). `writer.future(path)`
+        resolves to the file's SHA-256 once it is on disk (atomically, under path).
+
+    kwargs are forwarded to `iter_tdl_channels`. Returns the mean power E[|H|^2] of the
+    channels before normalization.
+    """
+    path = Path(path)
+    chunk_size = block_channels(chunk_size, num_rbs, rx_antenna_count, tx_antenna_count, max_block_bytes)
+    shape = (num_channels,) + tdl_channel_shape(num_rbs, rx_antenna_count, tx_antenna_count)
+    num_values = int(np.prod(shape))
+    kernel = None
+    if storage == "taps":
+        if kwargs.get("backend", "neoradium") != "numpy":
+            raise ValueError("storage='taps' requires backend='numpy'")
+        kernel = tap_terms(
+            kwargs.get("profile", "A"), kwargs.get("delay_spread", 500), kwargs.get("spacing", 15),
+            num_rbs, rx_antenna_count, tx_antenna_count,
+        ).kernel
+        shape = (num_channels, SYMBOLS_PER_SLOT, rx_antenna_count, tx_antenna_count, len(kernel))
+    out_shape, out_dtype = output_layout(shape, dtype)
+    schedule = {key: kwargs.pop(key) for key in ("slots_per_channel", "slot_jitter", "capture_slots") if key in kwargs}
+    if "random_seed" in kwargs:
+        schedule["random_seed"] = kwargs["random_seed"]
+    kwargs["capture_slots"] = capture_schedule(num_channels, **schedule)
+    if timestamps_path is not None:
+        times = capture_times(kwargs["capture_slots"], kwargs.get("spacing", 15))
+        if writer is not None:
+            writer.submit(timestamps_path, times)
+        else:
+            with open(timestamps_path, "wb") as f:
+                np.save(f, times)
+    blocks = iter_tdl_channels(
+        num_channels,
+        chunk_size=chunk_size,
+        num_rbs=num_rbs,
+        tx_antenna_count=tx_antenna_count,
+        rx_antenna_count=rx_antenna_count,
+        profiler=profiler,
+        storage=storage,
+        max_block_bytes=max_block_bytes,
+        **kwargs,
     )
+    streaming = storage == "taps" or not normalize_mean_power
+    if writer is None:
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=out_dtype, shape=out_shape)
+    elif streaming:
+        out = writer.open(path, out_shape, out_dtype)
+    else:
+        out = np.empty(out_shape, dtype=out_dtype)
 
-    channel_matrices = []
-    iterator = tqdm(range(num_channels), desc="TDL channels") if show_progress else range(num_channels)
-    for _ in iterator:
-        channel_matrices.append(channel.getChannelMatrix())
-        for _ in range(slots_per_channel):
-            channel.goNext()
+    if storage == "taps":
+        power_sum = _fill(out, blocks, dtype, profiler, kernel)
+        mean_power = power_sum / num_values if num_values else 0.0
+    elif dtype == "complex128" or not normalize_mean_power:
+        power_sum = _fill(out, blocks, dtype, profiler)
+        mean_power = power_sum / num_values if num_values else 0.0
+        if normalize_mean_power and mean_power > 0:
+            with phase(profiler, "normalize"):
+                _scale_in_place(out, np.sqrt(mean_power), chunk_size)
+    else:
+        stage = path.with_name(f".{path.name}.raw")
+        if writer is None:
+            raw = np.lib.format.open_memmap(stage, mode="w+", dtype=np.complex128, shape=shape)
+        else:
+            raw = np.empty(shape, dtype=np.complex128)
+        try:
+            power_sum = _fill(raw, blocks, profiler=profiler)
+            mean_power = power_sum / num_values if num_values else 0.0
+            with phase(profiler, "normalize"):
+                _scale_into(out, raw, np.sqrt(mean_power) if mean_power > 0 else 1.0, dtype, chunk_size)
+        finally:
+            del raw
+            if writer is None:
+                stage.unlink()
+    with phase(profiler, "save"):
+        if writer is None:
+            out.flush()
+        elif streaming:
+            out.close()
+        else:
+            writer.submit(path, out)
+        del out
+    return float(mean_power)
 
 
-    out = np.array(channel_matrices)
-    if normalize_mean_power:
-        scale = np.sqrt(np.mean(np.abs(out) ** 2))
-        if scale > 0:
-            out = out / scale
-    return out
\ No newline at end of file
+def write_tdl_doppler_sweep(
+    paths: list[Path],
+    doppler_shifts: list[float],
+    num_channels: int = 10000,
+    *,
+    num_rbs: int = 10,
+    tx_antenna_count: int = 1,
+    rx_antenna_count: int = 1,
+    normalize_mean_power: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dtype: str = "complex128",
+    profiler: Profiler | None = None,
+    timestamps_paths: list[Path | None] | None = None,
+    storage: str = "dense",
+    max_block_bytes: int = DEFAULT_MAX_BLOCK_BYTES,
+    **kwargs,
+) -> list[float]:
+    """`write_tdl_channels` for several Doppler shifts from one shared fading draw.
+
+    The sum-of-sinusoids phases and angles are drawn once from random_seed and evaluated
+    at every shift in one vectorized pass (backend='numpy' only, see the doppler_shifts
+    argument of `src.tdl_native.iter_native_tdl_channels`). paths[d] gets exactly the file
+    `write_tdl_channels(paths[d], doppler_shift=doppler_shifts[d], ...)` would write with the
+    same seed, so each file has the statistics of its Doppler shift. The files are fully
+    correlated with each other: the same draw scaled in time, not independent channels.
+
+    The fading is evaluated for about chunk_size channels in total per pass (chunk_size / D
+    per shift), and the channels are collected into the same chunk_size blocks a single
+    file is written in, so power sums round identically. Peak memory is one such block
+    per shift. Returns the mean power of every file before normalization.
+    """
+    if kwargs.get("backend", "neoradium") != "numpy":
+        raise ValueError("Shared-fading Doppler sweeps require backend='numpy'")
+    if "doppler_shift" in kwargs:
+        raise ValueError("Pass the shifts as doppler_shifts")
+    paths = [Path(path) for path in paths]
+    if len(paths) != len(doppler_shifts):
+        raise ValueError("Need one path per Doppler shift")
+    chunk_size = block_channels(chunk_size, num_rbs, rx_antenna_count, tx_antenna_count, max_block_bytes)
+    shape = (num_channels,) + tdl_channel_shape(num_rbs, rx_antenna_count, tx_antenna_count)
+    num_values = int(np.prod(shape))
+    kernel = None
+    if storage == "taps":
+        kernel = tap_terms(
+            kwargs.get("profile", "A"), kwargs.get("delay_spread", 500), kwargs.get("spacing", 15),
+            num_rbs, rx_antenna_count, tx_antenna_count,
+        ).kernel
+        shape = (num_channels, SYMBOLS_PER_SLOT, rx_antenna_count, tx_antenna_count, len(kernel))
+    out_shape, out_dtype = output_layout(shape, dtype)
+    schedule = {key: kwargs.pop(key) for key in ("slots_per_channel", "slot_jitter", "capture_slots") if key in kwargs}
+    if "random_seed" in kwargs:
+        schedule["random_seed"] = kwargs["random_seed"]
+    kwargs["capture_slots"] = capture_schedule(num_channels, **schedule)
+    times = capture_times(kwargs["capture_slots"], kwargs.get("spacing", 15))
+    for timestamps_path in timestamps_paths or []:
+        if timestamps_path is not None:
+            with open(timestamps_path, "wb") as f:
+                np.save(f, times)
+
+    rescale = storage == "dense" and normalize_mean_power
+    staged = rescale and dtype != "complex128"
+    outs = [np.lib.format.open_memmap(path, mode="w+", dtype=out_dtype, shape=out_shape) for path in paths]
+    stages = [path.with_name(f".{path.name}.raw") for path in paths] if staged else []
+    targets = [np.lib.format.open_memmap(stage, mode="w+", dtype=np.complex128, shape=shape)
+               for stage in stages] if staged else outs
+    power_sums = np.zeros(len(paths))
+    try:
+        blocks = iter_tdl_channels(
+            num_channels,
+            chunk_size=max(1, chunk_size // len(paths)),
+            num_rbs=num_rbs,
+            tx_antenna_count=tx_antenna_count,
+            rx_antenna_count=rx_antenna_count,
+            profiler=profiler,
+            storage=storage,
+            doppler_shifts=list(doppler_shifts),
+            max_block_bytes=max_block_bytes,
+            **kwargs,
+        )
+        buffer = np.empty((len(paths), chunk_size) + shape[1:], dtype=np.complex128)
+        offset = filled = 0
+        for block in blocks:                                  # (D, n, ...)
+            start = 0
+            while start < block.shape[1]:
+                take = min(block.shape[1] - start, chunk_size - filled)
+                buffer[:, filled:filled + take] = block[:, start:start + take]
+                filled += take
+                start += take
+                if filled == chunk_size or offset + filled == num_channels:
+                    with phase(profiler, "store"):
+                        for d, target in enumerate(targets):
+                            power_sums[d] += _store(
+                                target, offset, buffer[d, :filled], "complex128" if staged else dtype, kernel
+                            )
+                    offset += filled
+                    filled = 0
+        del buffer
+        mean_powers = [power_sum / num_values if num_values else 0.0 for power_sum in power_sums]
+        if rescale:
+            with phase(profiler, "normalize"):
+                for out, target, mean_power in zip(outs, targets, mean_powers):
+                    scale = np.sqrt(mean_power) if mean_power > 0 else 1.0
+                    if staged:
+                        _scale_into(out, target, scale, dtype, chunk_size)
+                    elif mean_power > 0:
+                        _scale_in_place(out, scale, chunk_size)
+        with phase(profiler, "save"):
+            for out in outs:
+                out.flush()
+    finally:
+        del targets, outs
+        for stage in stages:
+            stage.unlink(missing_ok=True)
+    return [float(mean_power) for mean_power in mean_powers]
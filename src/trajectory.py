@@ -0,0 +1,206 @@
+"""
+Long continuous channel trajectories and zero-copy sliding-window datasets.
+
+In trajectory mode (a `trajectory` section in the train config) every
+(delay_spread, doppler_shift) pair is stored as num_trajectories continuous time
+series of `length` captures, one every slots_per_channel slots, each from its own
+seed. The fading must be continuous across slots, so trajectories use GMEDS1 (Xiao
+draws every slot independently). Every series is written once.
+
+Prediction datasets are windows over those series: `sliding_windows` turns a
+(T, ...) series (in memory or a read-only memmap) into a (num_windows, window +
+horizon, ...) strided view, using `np.lib.stride_tricks.sliding_window_view`,
+without copying anything. `TrajectoryWindows` indexes the windows of every series
+of a dataset. Shuffling permutes window indices, and only a requested batch is
+gathered into memory. Window definitions (`WindowSpec`) are named in the config's
+`windows` section and recorded in metadata.yaml, so train/test splits over the same
+files are reproducible, e.g. by time range (start/stop) or by trajectory id.
+"""
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from src.config import load_config
+from src.reader import dataset_folders
+from src.tdl import storage_decoder, to_complex
+
+
+class WindowSpec(NamedTuple):
+    window: int                        # input captures per sample
+    stride: int = 1                    # captures between the starts of consecutive windows
+    horizon: int = 0                   # target captures following the input
+    start: int = 0                     # windows lie within captures [start, stop) of a series
+    stop: int | None = None
+    trajectories: tuple | None = None  # trajectory ids to use (None: all)
+
+
+def window_spec(definition) -> WindowSpec:
+    """WindowSpec from a config/metadata mapping (or a WindowSpec), validated."""
+    if not isinstance(definition, WindowSpec):
+        definition = dict(definition)
+        if definition.get("trajectories") is not None:
+            definition["trajectories"] = tuple(int(t) for t in definition["trajectories"])
+        definition = WindowSpec(**definition)
+    if definition.window < 1 or definition.stride < 1 or definition.horizon < 0 or definition.start < 0:
+        raise ValueError(f"Invalid window definition {definition}")
+    return definition
+
+
+def spec_metadata(spec: WindowSpec) -> dict:
+    """metadata.yaml form of a WindowSpec (inverse of `window_spec`)."""
+    fields = spec._asdict()
+    if spec.trajectories is not None:
+        fields["trajectories"] = list(spec.trajectories)
+    return fields
+
+
+def trajectory_settings(config: dict) -> dict:
+    """The validated `trajectory` section of a config: length, num_trajectories and sos_type.
+
+    Raises ValueError for settings that would break the continuity of a series.
+    """
+    trajectory = config["trajectory"]
+    settings = {
+        "length": int(trajectory["length"]),
+        "num_trajectories": int(trajectory.get("num_trajectories", 1)),
+        "sos_type": config.get("sos_type", "GMEDS1"),
+    }
+    if settings["sos_type"] != "GMEDS1":
+        raise ValueError("Trajectories need sos_type 'GMEDS1'; 'Xiao' draws every slot independently")
+    if config.get("slot_jitter", 0) or "capture_slots" in config:
+        raise ValueError("Trajectories are sampled on a regular grid: use slots_per_channel, not slot_jitter")
+    if settings["length"] < 1 or settings["num_trajectories"] < 1:
+        raise ValueError(f"Invalid trajectory settings {trajectory}")
+    return settings
+
+
+def num_windows(length: int, spec: WindowSpec) -> int:
+    """Number of windows of spec in a series of the given length."""
+    stop = length if spec.stop is None else min(spec.stop, length)
+    span = spec.window + spec.horizon
+    return max(0, (stop - spec.start - span) // spec.stride + 1)
+
+
+def sliding_windows(series: np.ndarray, spec: WindowSpec) -> np.ndarray:
+    """Read-only (num_windows, window + horizon, ...) view of a (T, ...) series, no copy.
+
+    Window i covers captures [start + i * stride, start + i * stride + window + horizon);
+    the first `window` are the input and the last `horizon` the prediction target.
+    """
+    spec = window_spec(spec)
+    span = spec.window + spec.horizon
+    count = num_windows(len(series), spec)
+    if count == 0:
+        return np.empty((0, span) + series.shape[1:], dtype=series.dtype)
+    segment = series[spec.start:spec.start + (count - 1) * spec.stride + span]
+    views = np.lib.stride_tricks.sliding_window_view(segment, span, axis=0)[::spec.stride]
+    return np.moveaxis(views, -1, 1)
+
+
+class TrajectoryWindows:
+    def __init__(self, series: list[np.ndarray], spec: WindowSpec, info: list[dict] | None = None,
+                 decoders: list | None = None, *, as_complex: bool = True):
+        """
+        series: (T, ...) arrays or memmaps, one per trajectory (used as is, never copied).
+        spec: the windows to expose (WindowSpec or its dict form).
+        info: per-series dict (e.g. the metadata.yaml entry) reported by `window_info`.
+        decoders: per-series `src.tdl.storage_decoder` (None for dense storage), applied
+            by `get_batch`.
+        as_complex: convert float16 (real, imag) pairs to complex64 in `get_batch`.
+        """
+        self.spec = window_spec(spec)
+        self.series = list(series)
+        self.info = info if info is not None else [{} for _ in self.series]
+        self.decoders = decoders if decoders is not None else [None] * len(self.series)
+        self.as_complex = as_complex
+        self.windows = [sliding_windows(s, self.spec) for s in self.series]
+        counts = np.array([len(w) for w in self.windows], dtype=np.int64)
+        self.series_starts = np.concatenate(([0], np.cumsum(counts)))
+
+    @classmethod
+    def from_dataset(cls, root: Path, split="train", *, mmap: bool = True, as_complex: bool = True):
+        """Windows over a trajectory dataset.
+
+        split: name of a window definition in metadata.yaml (`windows` section) or an
+            explicit WindowSpec / dict. Its trajectory ids select the series.
+        mmap: open the series as read-only memmaps (default) or load each into memory once.
+        """
+        series, info, decoders = [], [], []
+        spec = None
+        for folder in dataset_folders(root):
+            metadata = load_config(folder / "metadata.yaml")
+            if "trajectory" not in metadata:
+                raise ValueError(f"{folder} was not generated in trajectory mode")
+            if isinstance(split, str):
+                definitions = metadata.get("windows") or {}
+                if split not in definitions:
+                    raise KeyError(f"No window definition {split!r} in {folder / 'metadata.yaml'}; "
+                                   f"available: {sorted(definitions)}")
+                spec = window_spec(definitions[split])
+            else:
+                spec = window_spec(split)
+            for entry in metadata["generated"]:
+                if spec.trajectories is not None and entry["trajectory"] not in spec.trajectories:
+                    continue
+                series.append(np.load(folder / entry["file"], mmap_mode="r" if mmap else None))
+                info.append({**entry, "file": folder / entry["file"]})
+                decoders.append(storage_decoder(metadata, entry))
+        return cls(series, spec, info, decoders, as_complex=as_complex)
+
+    def __len__(self) -> int:
+        return int(self.series_starts[-1])
+
+    def locate(self, indices) -> tuple[np.ndarray, np.ndarray]:
+        """Map global window indices to (series ids, window index within series)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if np.any((indices < 0) | (indices >= len(self))):
+            raise IndexError("window index out of range")
+        series_ids = np.searchsorted(self.series_starts, indices, side="right") - 1
+        return series_ids, indices - self.series_starts[series_ids]
+
+    def window_info(self, idx: int) -> dict:
+        """Series info plus the first capture (row of the series) of window idx."""
+        series_id, local = self.locate(idx)
+        return {**self.info[series_id], "offset": self.spec.start + int(local) * self.spec.stride}
+
+    def __getitem__(self, idx: int) -> tuple[np.ndarray, np.ndarray]:
+        """(input, target) of window idx, (window, ...) and (horizon, ...), in the layout of
+        `get_batch`: views for dense complex files, decoded copies of this window otherwise."""
+        series_id, local = self.locate(idx)
+        window = self.windows[series_id][local]
+        decoder = self.decoders[series_id]
+        if decoder is not None:
+            window = decoder(window)
+        if self.as_complex:
+            window = to_complex(window)
+        return window[:self.spec.window], window[self.spec.window:]
+
+    def shuffled_indices(self, seed: int, epoch: int = 0) -> np.ndarray:
+        """Reproducible permutation of all window indices for one epoch (nothing is copied)."""
+        return np.random.default_rng([seed, epoch]).permutation(len(self))
+
+    def get_batch(self, indices) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Gather windows (only these are copied into memory), decoded and in request order.
+
+        Returns (inputs (B, window, ...), targets (B, horizon, ...), delay_spreads (B,),
+        doppler_shifts (B,)).
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        series_ids, local = self.locate(indices)
+        parts, positions = [], []
+        for series_id in np.unique(series_ids):
+            mask = np.flatnonzero(series_ids == series_id)
+            block = self.windows[series_id][local[mask]]
+            decoder = self.decoders[series_id]
+            parts.append(block if decoder is None else decoder(block))
+            positions.append(mask)
+        first = parts[0] if parts else sliding_windows(self.series[0][:0], self.spec)
+        out = np.empty((len(indices),) + first.shape[1:], dtype=first.dtype)
+        for mask, block in zip(positions, parts):
+            out[mask] = block
+        if self.as_complex:
+            out = to_complex(out)
+        delay_spreads = np.array([info.get("delay_spread_ns") for info in self.info])[series_ids]
+        doppler_shifts = np.array([info.get("doppler_shift_hz") for info in self.info])[series_ids]
+        return out[:, :self.spec.window], out[:, self.spec.window:], delay_spreads, doppler_shifts
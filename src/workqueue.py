@@ -0,0 +1,223 @@
+"""
+Shared-filesystem work queue for multi-node dataset builds.
+
+Every process (on any node) that points at the same output folder builds the same
+job list from the config and works through it; coordination only uses atomic file
+operations in <output_dir>/.queue, so no scheduler or network service is needed:
+
+  queue.json        job keys of the build; the first process writes it, later ones
+                    must agree (a different config needs a fresh queue)
+  claims/<i>.lock   claim on item i, created with O_CREAT | O_EXCL and holding its
+                    owner's token. Its mtime is a lease refreshed while the item
+                    runs; a lock older than lease_timeout belongs to a dead worker
+                    and is reclaimed. A worker only renews or removes a lock that
+                    still holds its own token, so a slow worker whose lease was
+                    reclaimed never touches the new owner's claim
+  done/<i>.json     result of item i (written to a temporary name, then renamed);
+                    removed again to requeue an item whose output is lost
+  claims/merge.lock claim on merging the results, leased like an item, so a merger
+                    that dies is replaced after lease_timeout
+  merged            written by the merger after all merged outputs are in place
+
+Lock files rely on O_EXCL create and rename being atomic on the shared filesystem
+(local filesystems and NFSv3+).
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.config import worker_id
+
+QUEUE_DIR = ".queue"
+MERGE = "merge"  # lock name of the merge step (items are numbered)
+
+
+def _write_json(path: Path, data) -> None:
+    tmp = path.with_name(f".{path.name}.{worker_id()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class WorkQueue:
+    def __init__(self, root: Path, keys: list[str], lease_timeout: float = 600.0):
+        """root: queue folder on the shared filesystem; keys: one content key per item."""
+        self.root = Path(root)
+        self.keys = list(keys)
+        self.lease_timeout = lease_timeout
+        self.claims = self.root / "claims"
+        self.done = self.root / "done"
+        self.claims.mkdir(parents=True, exist_ok=True)
+        self.done.mkdir(parents=True, exist_ok=True)
+        self._tokens = {}  # lock path -> token of the claims this process holds
+
+        queue_file = self.root / "queue.json"
+        tmp = queue_file.with_name(f".queue.json.{worker_id()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"keys": self.keys}, f)
+        try:
+            os.link(tmp, queue_file)  # atomic create-if-absent
+        except FileExistsError:
+            pass
+        finally:
+            tmp.unlink()
+        if _read_json(queue_file)["keys"] != self.keys:
+            raise ValueError(f"{queue_file} was created for a different build; remove {self.root} to start over")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _lock(self, i: int | str) -> Path:
+        return self.claims / f"{i}.lock"
+
+    def result(self, i: int) -> dict | None:
+        """Result of item i if it is done (for the current key), else None."""
+        record = _read_json(self.done / f"{i}.json")
+        if record is None or record["key"] != self.keys[i]:
+            return None
+        return record["result"]
+
+    def pending(self) -> list[int]:
+        return [i for i in range(len(self)) if self.result(i) is None]
+
+    def claim(self, i: int) -> bool:
+        """Try to take item i; True if this process now holds it."""
+        if self.result(i) is not None or not self._acquire(self._lock(i)):
+            return False
+        # The item may have finished between the done check and the claim.
+        if self.result(i) is not None:
+            self.release(i)
+            return False
+        return True
+
+    def _acquire(self, lock: Path) -> bool:
+        """Create lock with a fresh token (reclaiming it if stale); True if this process holds it."""
+        token = f"{worker_id()}-{time.time_ns()}"
+        for _ in range(2):
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._reclaim_if_stale(lock):
+                    return False
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(token)
+            self._tokens[lock] = token
+            return True
+        return False
+
+    def _reclaim_if_stale(self, lock: Path) -> bool:
+        """Remove lock if its lease expired. Safe against concurrent reclaimers."""
+        try:
+            if time.time() - lock.stat().st_mtime < self.lease_timeout:
+                return False
+            token = lock.read_text()
+        except FileNotFoundError:
+            return True
+        return self._remove_if_token(lock, token) is not False
+
+    def _remove_if_token(self, lock: Path, token: str) -> bool | None:
+        """Remove lock only if it still holds token: True if removed, False if it holds
+        another token (left in place), None if it was already gone."""
+        grave = lock.with_name(f".{lock.name}.{worker_id()}.stale")
+        try:
+            os.rename(lock, grave)
+        except FileNotFoundError:
+            return None
+        if grave.read_text() != token:
+            # We moved a lock taken by someone else: put it back (link never overwrites).
+            try:
+                os.link(grave, lock)
+            except FileExistsError:
+                pass
+            grave.unlink()
+            return False
+        grave.unlink()
+        return True
+
+    def owns(self, i: int | str) -> bool:
+        """True while the lock of item i still holds this process's token."""
+        lock = self._lock(i)
+        try:
+            return lock.read_text() == self._tokens.get(lock)
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def lease(self, i: int | str):
+        """Keep the claim on item i alive (refresh its mtime) while the body runs.
+
+        Renewal stops for good once the lock no longer holds this process's token
+        (the lease expired and another worker reclaimed the item).
+        """
+        lock = self._lock(i)
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lease_timeout / 4):
+                if not self.owns(i):
+                    return
+                try:
+                    os.utime(lock)
+                except FileNotFoundError:
+                    return
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def complete(self, i: int, result: dict) -> None:
+        _write_json(self.done / f"{i}.json", {"key": self.keys[i], "result": result})
+
+    def requeue(self, i: int) -> None:
+        """Drop item i's result (e.g. its file went missing) so it runs again, and forget the merge."""
+        (self.done / f"{i}.json").unlink(missing_ok=True)
+        self.unmerge()
+
+    def release(self, i: int | str) -> None:
+        """Drop this process's claim on item i; a lock reclaimed by another worker is left alone."""
+        lock = self._lock(i)
+        token = self._tokens.pop(lock, None)
+        if token is not None:
+            self._remove_if_token(lock, token)
+
+    def merged(self) -> bool:
+        return (self.root / "merged").exists()
+
+    def claim_merge(self) -> bool:
+        """Try to take the merge of a finished queue; True if this process now holds it.
+
+        Hold it with `lease(MERGE)` while writing the merged outputs, then call
+        `finish_merge`. A merger that dies before that leaves a lock that is reclaimed
+        after lease_timeout, so the merge is retried instead of lost.
+        """
+        if self.pending() or self.merged() or not self._acquire(self._lock(MERGE)):
+            return False
+        if self.pending() or self.merged():
+            self.release(MERGE)
+            return False
+        return True
+
+    def finish_merge(self) -> None:
+        """Mark the queue merged (once every merged output is written) and drop the merge claim."""
+        _write_json(self.root / "merged", {"worker": worker_id()})
+        self.release(MERGE)
+
+    def unmerge(self) -> None:
+        """Forget a completed merge so the next caller merges again."""
+        (self.root / "merged").unlink(missing_ok=True)
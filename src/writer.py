@@ -0,0 +1,228 @@
+"""
+Background .npy writer that overlaps disk I/O with channel generation.
+
+`BackgroundWriter` owns one thread that writes .npy files while the caller
+generates the next ones. Whole arrays (`submit`) or chunks of a file being
+generated (`open`, then `ChunkStream` writes) go through a bounded queue: every
+array or chunk holds one of max_in_flight slots until it is on disk, so the
+caller blocks (backpressure) instead of buffering without limit.
+
+Each file is written to a temporary name, fsynced and renamed into place, and its
+SHA-256 is computed from the bytes as they are written (no second read). Every
+write returns a `concurrent.futures.Future` of that checksum. Items are written in
+submission order. A failed write sets its future's exception, and the error is
+also raised from the next `submit`/`open` call and from `close`. A stream whose
+generation fails is dropped with `ChunkStream.abort`, which removes its temporary
+file without waiting for the writer to close.
+"""
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+
+from src.config import worker_id
+
+
+class _HashingFile:
+    """Write-only file wrapper that hashes everything written through it."""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        return self.f.write(data)
+
+
+class _Target:
+    """A file being written: temporary handle, final path and the future of its checksum."""
+
+    def __init__(self, path: Path, fsync: bool):
+        self.path = path
+        self.tmp = path.with_name(f".{path.name}.{worker_id()}.tmp")
+        self.fsync = fsync
+        self.future = Future()
+        self.file = None
+        self.failed = False
+
+    def start(self) -> _HashingFile:
+        self.file = _HashingFile(open(self.tmp, "wb"))
+        return self.file
+
+    def finish(self) -> None:
+        self.file.f.flush()
+        if self.fsync:
+            os.fsync(self.file.f.fileno())
+        self.file.f.close()
+        os.replace(self.tmp, self.path)
+        if self.fsync:
+            directory = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        self.future.set_result(self.file.digest.hexdigest())
+
+    def fail(self, error: BaseException) -> None:
+        self.failed = True
+        if self.file is not None:
+            self.file.f.close()
+        self.tmp.unlink(missing_ok=True)
+        self.future.set_exception(error)
+
+
+class ChunkStream:
+    """A .npy file written chunk by chunk along axis 0 by a `BackgroundWriter`.
+
+    Assigning to consecutive slices (stream[a:b] = chunk) writes them in order, so a
+    stream can stand in for a preallocated output array in fill loops. A stream that
+    cannot be completed is dropped with `abort`; used as a context manager it is closed
+    on success and aborted if the block raises.
+    """
+
+    def __init__(self, writer: "BackgroundWriter", target: _Target, shape: tuple, dtype: np.dtype):
+        self.writer = writer
+        self.target = target
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.offset = 0
+        self.closed = False
+
+    def __enter__(self) -> "ChunkStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.closed:
+            return
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort(exc)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def write(self, chunk: np.ndarray) -> None:
+        if self.closed:
+            raise ValueError(f"Stream {self.target.path} is already closed")
+        chunk = np.ascontiguousarray(chunk, dtype=self.dtype)
+        if chunk.shape[1:] != self.shape[1:] or self.offset + len(chunk) > len(self):
+            raise ValueError(f"Chunk of shape {chunk.shape} does not fit {self.shape} at row {self.offset}")
+        self.offset += len(chunk)
+        self.writer._put(("chunk", self.target, chunk))
+
+    def __setitem__(self, key: slice, chunk: np.ndarray) -> None:
+        if not isinstance(key, slice) or (key.start or 0) != self.offset:
+            raise ValueError(f"ChunkStream only accepts consecutive slices starting at row {self.offset}")
+        self.write(chunk)
+
+    def close(self) -> Future:
+        """Finish the file once every chunk is written; returns the future of its checksum."""
+        if self.offset != len(self):
+            raise ValueError(f"Stream {self.target.path} closed after {self.offset} of {len(self)} rows")
+        self.closed = True
+        self.writer._queue.put(("close", self.target, None))
+        return self.target.future
+
+    def abort(self, error: BaseException | None = None) -> None:
+        """Drop the file: once the chunks queued so far are processed, the writer closes it,
+        removes its temporary file and fails its future with error. Unlike a write error,
+        this is not raised again from the writer."""
+        if self.closed:
+            return
+        self.closed = True
+        if error is None:
+            error = RuntimeError(f"Stream {self.target.path} aborted after {self.offset} of {len(self)} rows")
+        self.writer._queue.put(("abort", self.target, error))
+
+
+class BackgroundWriter:
+    def __init__(self, max_in_flight: int = 2, fsync: bool = True):
+        """max_in_flight: arrays/chunks that may be queued or being written at once."""
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.fsync = fsync
+        self._slots = threading.Semaphore(max_in_flight)
+        self._queue = queue.Queue()
+        self._futures = {}
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(raise_errors=exc_type is None)
+
+    def submit(self, path: Path, array: np.ndarray) -> Future:
+        """Write array to path (as np.save would); the array must not be modified afterwards."""
+        target = self._target(path)
+        self._put(("array", target, array))
+        return target.future
+
+    def open(self, path: Path, shape: tuple, dtype) -> ChunkStream:
+        """Start a .npy file of the given shape and dtype to be filled with `ChunkStream.write`."""
+        target = self._target(path)
+        header = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": tuple(shape)}
+        self._queue.put(("header", target, header))
+        return ChunkStream(self, target, shape, dtype)
+
+    def future(self, path: Path) -> Future:
+        """Future of the latest write submitted for path (removed from the writer's index)."""
+        return self._futures.pop(Path(path))
+
+    def raise_errors(self) -> None:
+        """Raise the first write error (once) in the calling thread."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self, raise_errors: bool = True) -> None:
+        """Wait for every queued write, stop the thread and raise any pending error."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if raise_errors:
+            self.raise_errors()
+
+    def _target(self, path: Path) -> _Target:
+        self.raise_errors()
+        if not self._thread.is_alive():
+            raise RuntimeError("BackgroundWriter is closed")
+        target = _Target(Path(path), self.fsync)
+        self._futures[target.path] = target.future
+        return target
+
+    def _put(self, item: tuple) -> None:
+        self._slots.acquire()  # backpressure: wait until a buffer is written
+        self._queue.put(item)
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            kind, target, data = item
+            try:
+                if not target.failed:
+                    if kind == "array":
+                        np.lib.format.write_array(target.start(), data, allow_pickle=False)
+                        target.finish()
+                    elif kind == "header":
+                        np.lib.format.write_array_header_1_0(target.start(), data)
+                    elif kind == "chunk":
+                        target.file.write(data)
+                    elif kind == "abort":
+                        target.fail(data)
+                    else:
+                        target.finish()
+            except BaseException as error:
+                target.fail(error)
+                if self._error is None:
+                    self._error = error
+            finally:
+                if kind in ("array", "chunk"):
+                    self._slots.release()